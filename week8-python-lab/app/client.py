@@ -1,22 +1,30 @@
 import requests
 
 BASE_URL = "http://localhost:8000/books"
+CHANGES_URL = "http://localhost:8000/changes"
 
 
-def get_books():
+def get_books(page_size=100):
     """
-    Fetch all books from the web service.
+    Fetch all books from the web service, following the next_cursor of each page.
     """
-    response = requests.get(BASE_URL)
-    if response.status_code == 200:
-        books = response.json()
-        print("[GET] Books:")
-        for book in books:
-            print(f" - {book['title']}")
-        return books
-    else:
-        print(f"[GET] Failed to fetch books: {response.status_code}")
-        return None
+    books = []
+    params = {"limit": page_size}
+    while True:
+        response = requests.get(f"{BASE_URL}/", params=params)
+        if response.status_code != 200:
+            print(f"[GET] Failed to fetch books: {response.status_code}")
+            return None
+        page = response.json()
+        books.extend(page["items"])
+        if not page["next_cursor"]:
+            break
+        params["after"] = page["next_cursor"]
+
+    print("[GET] Books:")
+    for book in books:
+        print(f" - {book['title']}")
+    return books
 
 
 def get_book(book_id):
@@ -33,6 +41,30 @@ def get_book(book_id):
         return None
 
 
+def get_changes(since=None, batch_size=500):
+    """
+    Fetch the book and review changes made after the `since` cursor, batch by batch.
+    Returns the changes and the cursor to pass as `since` next time.
+    """
+    changes = []
+    params = {"limit": batch_size}
+    while True:
+        if since:
+            params["since"] = since
+        response = requests.get(f"{CHANGES_URL}/", params=params)
+        if response.status_code != 200:
+            print(f"[GET] Failed to fetch changes: {response.status_code}")
+            return None, since
+        batch = response.json()
+        changes.extend(batch["items"])
+        since = batch["next_cursor"]
+        if not batch["has_more"]:
+            break
+
+    print(f"[GET] {len(changes)} changes")
+    return changes, since
+
+
 # def add_book(new_book):
 #     """
 #     Add a new book using a POST request.
@@ -0,0 +1,19 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class AsyncService:
+    """
+    Base of the async counterpart of a service class, for an AsyncSession.
+
+    Subclasses set `sync_service` to the class they wrap and declare each method as a
+    one-line delegate through `_run`, which runs the sync implementation through
+    `AsyncSession.run_sync`, so database I/O is awaited on the event loop instead of
+    holding a threadpool worker.
+    """
+    sync_service: type
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def _run(self, method, *args):
+        return await self.db.run_sync(lambda session: method(self.sync_service(session), *args))
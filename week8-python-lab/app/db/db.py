@@ -1,11 +1,96 @@
-from sqlalchemy import create_engine, MetaData
+import os
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, event, MetaData
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+load_dotenv()
 
 # SQLAlchemy Database URL (SQLite for simplicity)
 DATABASE_URL = "sqlite:///./app.db"
 
+# Same database, reached through the aiosqlite driver for async routes
+ASYNC_DATABASE_URL = "sqlite+aiosqlite:///./app.db"
+
+# SQLite connection profiles. "default" keeps SQLite's own settings (rollback journal,
+# synchronous=FULL); "performance" lets readers run alongside a writer (WAL), syncs
+# only at checkpoints and keeps more of the database in memory.
+SQLITE_PROFILES = {
+    "default": {},
+    "performance": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 268435456,  # 256 MiB
+        "cache_size": -65536,  # negative values are KiB, so 64 MiB
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,  # milliseconds
+    },
+}
+
+
+def sqlite_pragmas(profile: str) -> dict:
+    """
+    Build the PRAGMA settings for a profile. Each setting can be overridden with an
+    SQLITE_<NAME> environment variable, e.g. SQLITE_CACHE_SIZE=-131072.
+    """
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown SQLITE_PROFILE '{profile}', expected one of {sorted(SQLITE_PROFILES)}")
+    pragmas = dict(SQLITE_PROFILES[profile])
+    for name in SQLITE_PROFILES["performance"]:
+        value = os.getenv(f"SQLITE_{name.upper()}")
+        if value:
+            pragmas[name] = value
+    for name, value in pragmas.items():
+        if not str(value).lstrip("-").isalnum():
+            raise ValueError(f"Invalid value for SQLite pragma {name}: {value!r}")
+    return pragmas
+
+
+def apply_sqlite_pragmas(engine: Engine, pragmas: dict):
+    """
+    Run the given PRAGMA statements on every new connection the engine's pool opens.
+    """
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def optimize_on_close(engine: Engine):
+    """
+    Run PRAGMA optimize on each of the engine's connections as its pool closes it (on
+    dispose() at shutdown, or when the pool discards it), so SQLite refreshes the query
+    planner statistics the queries on that connection would benefit from. The PRAGMA
+    only looks at the history of the connection it runs on, so it has to run on the
+    connections that served the requests.
+    """
+    @event.listens_for(engine.pool, "close")
+    def optimize_connection(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("PRAGMA optimize")
+        finally:
+            cursor.close()
+
+
+# Foreign keys are enforced whatever the profile: deleting a book relies on
+# ON DELETE CASCADE to remove its reviews.
+SQLITE_PRAGMAS = {"foreign_keys": "ON", **sqlite_pragmas(os.getenv("SQLITE_PROFILE", "performance"))}
+
 # Create engine
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+apply_sqlite_pragmas(engine, SQLITE_PRAGMAS)
+optimize_on_close(engine)
+
+# Create async engine. aiosqlite defaults to NullPool for file databases, which would
+# open a new connection (and aiosqlite worker thread) for every request.
+async_engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=AsyncAdaptedQueuePool)
+apply_sqlite_pragmas(async_engine.sync_engine, SQLITE_PRAGMAS)
+optimize_on_close(async_engine.sync_engine)
 
 # Base class for ORM models
 Base = declarative_base()
@@ -13,5 +98,9 @@ Base = declarative_base()
 # Session configuration
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async session configuration. Objects are not expired on commit, since their
+# attributes cannot be lazily reloaded once the handler is back on the event loop.
+AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False, bind=async_engine)
+
 # Metadata for custom queries
 metadata = MetaData()
@@ -1,13 +1,37 @@
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.security import HTTPBearer
-from app.routes import books, ai, chroma, reviews, auth
+from app.db.db import engine, async_engine
+from app.routes import books, ai, chroma, reviews, auth, metrics, changes
+from app.services.cognito_service import cognito_executor
+from app.utils.compression import CompressionMiddleware
 
 security = HTTPBearer()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Shutdown: cancel queued Cognito calls, then close pooled connections, each of which
+    # refreshes the planner statistics for its own query history (optimize_on_close)
+    cognito_executor.shutdown()
+    await async_engine.dispose()
+    engine.dispose()
+
 app = FastAPI(
     title="Book Management API",
     description="An API for managing books and integrating with OpenAI",
     version="1.0.0",
+    lifespan=lifespan,
+)
+
+# Compress JSON and NDJSON responses (gzip, or Brotli/zstd when installed and accepted)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024")),
+    gzip_level=int(os.getenv("COMPRESSION_GZIP_LEVEL", "6")),
+    brotli_quality=int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4")),
+    zstd_level=int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3")),
 )
 
 # Include routes
@@ -16,4 +40,5 @@ app.include_router(reviews.router, prefix="", tags=["Reviews"])
 app.include_router(ai.router, prefix="/ai", tags=["AI"])
 app.include_router(chroma.router, prefix="/chroma", tags=["ChromaDB"])
 app.include_router(auth.router, prefix="", tags=["Auth"])
-
+app.include_router(metrics.router, prefix="/metrics", tags=["Metrics"])
+app.include_router(changes.router, prefix="/changes", tags=["Changes"])
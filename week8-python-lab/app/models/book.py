@@ -1,6 +1,10 @@
-from sqlalchemy import Column, Integer, String
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Index, Integer, String, text
 from app.db.db import Base
+from app.models.review import ReviewResponse
+from typing import Literal, Optional
 from pydantic import BaseModel, Field
+from typing_extensions import TypedDict
 from sqlalchemy.orm import relationship
 
 class Book(Base):
@@ -10,9 +14,23 @@ class Book(Base):
     author = Column(String, nullable=False)
     year = Column(Integer, nullable=False)
     description = Column(String, nullable=True)
+    # Maintained by triggers on reviews (migration a71c4f2e9d58), never written by the app
+    review_count = Column(Integer, nullable=False, default=0, server_default=text("0"))
+    last_reviewed_at = Column(DateTime, nullable=True)
+    # Bumped by every update, which can require the version it read (compare-and-swap)
+    version = Column(Integer, nullable=False, default=1, server_default=text("1"))
 
-    # Relationship with reviews
-    reviews = relationship("Review", back_populates="book", cascade="all, delete-orphan")
+    # Relationship with reviews; deleting a book leaves its reviews to the ON DELETE CASCADE foreign key
+    reviews = relationship("Review", back_populates="book", cascade="all, delete-orphan", passive_deletes=True)
+
+    __table_args__ = (
+        # Filter by author, ordered by year (rows within a year follow id, the rowid)
+        Index("ix_books_author_year", "author", "year"),
+        # Year ranges and year-ordered keyset pagination
+        Index("ix_books_year_id", "year", "id"),
+        # "Most reviewed" listings and their keyset pagination
+        Index("ix_books_review_count_id", "review_count", "id"),
+    )
 
 # Pydantic Models for Request/Response
 class BookBase(BaseModel):
@@ -26,6 +44,83 @@ class BookCreate(BookBase):
 
 class BookResponse(BookBase):
     id: int
+    review_count: int = Field(0, description="Number of reviews of the book")
+    last_reviewed_at: Optional[datetime] = Field(None, description="When the latest review was added (UTC), or null")
+    version: int = Field(1, description="Row version, bumped by every update; send it back to update only this version")
 
     class Config:
         from_attributes = True
+
+class BookWithReviews(BookResponse):
+    reviews: list[ReviewResponse] = Field(..., description="The book's first reviews, in id order, up to the requested cap")
+
+class BookWithReviewsPage(BaseModel):
+    items: list[BookWithReviews]
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page, or null on the last page")
+
+# Fields a client can select with ?fields=
+BOOK_FIELDS = tuple(BookResponse.model_fields)
+
+class BookRow(TypedDict, total=False):
+    """
+    A books row (or the columns picked with ?fields=) as plain data. List responses
+    serialize these straight to JSON, skipping BookResponse validation.
+    """
+    id: int
+    title: str
+    author: str
+    year: int
+    description: Optional[str]
+    review_count: int
+    last_reviewed_at: Optional[datetime]
+    version: int
+
+class BookRowPage(TypedDict):
+    items: list[BookRow]
+    next_cursor: Optional[str]
+
+class BookRowBatch(TypedDict):
+    items: list[BookRow]
+    missing: list[int]
+
+# Orders a client can list books in with ?sort=; a leading "-" sorts descending
+BookSort = Literal["id", "-id", "year", "-year", "review_count", "-review_count"]
+
+class BookFilters(BaseModel):
+    author: Optional[str] = Field(None, description="Only books by exactly this author")
+    year_from: Optional[int] = Field(None, description="Only books published in or after this year")
+    year_to: Optional[int] = Field(None, description="Only books published in or before this year")
+
+class BookPage(BaseModel):
+    items: list[BookResponse]
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page, or null on the last page")
+
+# Most ids a single batch lookup may ask for
+BOOK_BATCH_MAX_IDS = 500
+
+class BookBatchRequest(BaseModel):
+    ids: list[int] = Field(..., min_length=1, max_length=BOOK_BATCH_MAX_IDS, description="Book ids to look up, in the order wanted")
+
+class BookBatch(BaseModel):
+    items: list[BookResponse] = Field(..., description="Books found, in the requested order")
+    missing: list[int] = Field(..., description="Requested ids that have no book")
+
+class BookSearchResult(BaseModel):
+    id: int
+    title: str
+    author: str
+    year: int
+    snippet: str = Field(..., description="Best-matching excerpt, with matched terms wrapped in <mark></mark>")
+    rank: float = Field(..., description="BM25 score; lower is a better match")
+
+class BulkCreatedItem(BaseModel):
+    index: int
+    id: int
+
+class BulkItemError(BaseModel):
+    index: int
+    errors: list[dict]
+
+class BookBulkResult(BaseModel):
+    created: list[BulkCreatedItem]
+    errors: list[BulkItemError]
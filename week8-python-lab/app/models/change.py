@@ -0,0 +1,37 @@
+from datetime import datetime
+from typing import Literal
+from pydantic import BaseModel, Field
+from sqlalchemy import Column, DateTime, Integer, String, text
+from app.db.db import Base
+
+class Change(Base):
+    """
+    One create, update or delete of a book or review, appended by database triggers
+    on those tables (migration c52e8b1f7a03). `seq` is an AUTOINCREMENT key, so it
+    only ever grows and is never reused: it is the change feed's cursor.
+    """
+    __tablename__ = "changes"
+    __table_args__ = {"sqlite_autoincrement": True}
+    seq = Column(Integer, primary_key=True)
+    entity = Column(String, nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    book_id = Column(Integer, nullable=False)
+    op = Column(String, nullable=False)
+    changed_at = Column(DateTime, nullable=False, server_default=text("CURRENT_TIMESTAMP"))
+
+# Pydantic Models for Request/Response
+class ChangeResponse(BaseModel):
+    seq: int
+    entity: Literal["book", "review"]
+    entity_id: int = Field(..., description="Id of the book or review that changed")
+    book_id: int = Field(..., description="The book itself, or the book a review belongs to")
+    op: Literal["create", "update", "delete"] = Field(..., description="delete entries are tombstones: the row is gone")
+    changed_at: datetime = Field(..., description="When the change was committed (UTC)")
+
+    class Config:
+        from_attributes = True
+
+class ChangePage(BaseModel):
+    items: list[ChangeResponse]
+    next_cursor: str = Field(..., description="Pass as ?since= to get the changes after this page, now or later")
+    has_more: bool = Field(..., description="Whether more changes are already waiting after this page")
@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
-from pydantic import BaseModel
+from typing import Optional
+from sqlalchemy import Column, Index, Integer, String, ForeignKey, text
+from pydantic import BaseModel, Field
 from sqlalchemy.orm import relationship
 from app.db.db import Base
 
@@ -8,10 +9,16 @@ class Review(Base):
     id = Column(Integer, primary_key=True, index=True)
     review = Column(String, nullable=False)
     book_id = Column(Integer, ForeignKey("books.id", ondelete="CASCADE"), nullable=False)
+    version = Column(Integer, nullable=False, default=1, server_default=text("1"))
 
     # Relationship with the Book model
     book = relationship("Book", back_populates="reviews")
 
+    __table_args__ = (
+        # A book's reviews in id order, for listing and keyset pagination
+        Index("ix_reviews_book_id_id", "book_id", "id"),
+    )
+
 class ReviewBase(BaseModel):
     review: str
 
@@ -21,6 +28,11 @@ class ReviewCreate(ReviewBase):
 class ReviewResponse(ReviewBase):
     id: int
     book_id: int
+    version: int = Field(1, description="Row version, bumped by every update; send it back to update only this version")
 
     class Config:
         from_attributes = True
+
+class ReviewPage(BaseModel):
+    items: list[ReviewResponse]
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page, or null on the last page")
@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer, String
+from app.db.db import Base
+
+class TableVersion(Base):
+    """
+    Per-table change counter, bumped by database triggers on every insert,
+    update and delete so it can back ETags for whole collections.
+    """
+    __tablename__ = "table_versions"
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
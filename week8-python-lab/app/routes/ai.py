@@ -31,7 +31,7 @@ def introduce_book(book_id: int = Path(..., title="The ID of the book to introdu
     """
     # Get the book details from the database
     service = BookService(db)
-    book = service.get_book(book_id)
+    book = service.get_cached_book(book_id)
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
 
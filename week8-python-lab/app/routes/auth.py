@@ -1,16 +1,20 @@
 from fastapi import APIRouter, HTTPException
-from app.services.cognito_service import CognitoService
+from app.services.cognito_service import get_cognito_service
+from app.utils.bounded_executor import ExecutorFull
 
 router = APIRouter()
-cognito_service = CognitoService()
+cognito_service = get_cognito_service()
 
 @router.post("/login")
-def login(username: str, password: str):
+async def login(username: str, password: str):
     """
     Login endpoint to authenticate users and return a JWT token.
     """
     try:
-        tokens = cognito_service.authenticate_user(username, password)
+        tokens = await cognito_service.authenticate_user_async(username, password)
         return {"message": "Login successful", "tokens": tokens}
+    except ExecutorFull:
+        raise HTTPException(status_code=503, detail="Too many logins in progress, try again shortly.",
+                            headers={"Retry-After": "1"})
     except HTTPException as e:
         raise e
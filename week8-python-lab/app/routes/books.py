@@ -1,49 +1,344 @@
-from fastapi import APIRouter, HTTPException, Depends, Path
-from sqlalchemy.orm import Session
+import json
+import os
+from typing import Literal, Optional, Union
+from fastapi import APIRouter, HTTPException, Depends, Header, Path, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.book import Book, BookCreate, BookResponse
-from app.services.book_service import BookService
-from app.db.db import SessionLocal
+from app.models.book import (
+    Book, BookCreate, BookResponse, BookPage, BookWithReviews, BookWithReviewsPage, BookBatch, BookBatchRequest, BookRow, BookRowPage, BookRowBatch, BOOK_BATCH_MAX_IDS, BookBulkResult, BookSearchResult, BookFilters, BookSort, BOOK_FIELDS,
+)
+from app.services.book_service import BookService, AsyncBookService, VersionConflict
+from app.db.db import SessionLocal, AsyncSessionLocal
+from app.services.cognito_service import require_roles, CognitoAdminRole
+from app.utils.etag import make_etag, etag_matches, etag_version, versioned_etag
 
 router = APIRouter()
 
-# 1) Dependency to get the DB session
-def get_db():
+# Book writes need a verified token in the admins group
+require_admin = require_roles(CognitoAdminRole)
+
+# 1) Dependency to get the async DB session
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# 2) Dependency to get an AsyncBookService instance
+def get_book_service(db: AsyncSession = Depends(get_db)) -> AsyncBookService:
+    return AsyncBookService(db)
+
+def parse_fields(fields: Optional[str]) -> Optional[list[str]]:
+    """
+    Parse a comma-separated ?fields= list into column names, or None for all fields.
+    """
+    if fields is None:
+        return None
+    names = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in BOOK_FIELDS]
+    if not names or unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid fields {unknown or fields!r}; choose from {', '.join(BOOK_FIELDS)}",
+        )
+    return names
+
+FIELDS_QUERY = Query(None, description="Comma-separated fields to return, e.g. id,title,author (id and the sort key are always included)")
+INCLUDE_QUERY = Query(None, description="Embed related data: `reviews` adds each book's first reviews")
+# Books with embedded reviews are serialized by the routes themselves
+BOOKS_WITH_REVIEWS = TypeAdapter(list[BookWithReviews])
+
+# Plain rows go straight to JSON bytes through pydantic-core, without building ORM objects
+# or validating each one through BookResponse. BOOK_FAST_JSON=false restores that path for full rows.
+BOOK_FAST_JSON = os.getenv("BOOK_FAST_JSON", "true").lower() == "true"
+BOOK_ROW = TypeAdapter(BookRow)
+BOOK_ROWS = TypeAdapter(list[BookRow])
+BOOK_ROW_PAGE = TypeAdapter(BookRowPage)
+BOOK_ROW_BATCH = TypeAdapter(BookRowBatch)
+
+def json_response(body: bytes, etag: Optional[str] = None) -> Response:
+    return Response(content=body, media_type="application/json", headers={"ETag": etag} if etag else None)
+
+REVIEWS_LIMIT_QUERY = Query(10, ge=1, le=100, description="With include=reviews, the most reviews embedded per book")
+
+def check_include(include: Optional[str], columns: Optional[list[str]]):
+    if include is not None and columns is not None:
+        raise HTTPException(status_code=400, detail="include cannot be combined with fields")
+
+@router.get("/", response_model=Union[BookPage, list[BookResponse]])
+async def get_books(
+    request: Request,
+    response: Response,
+    limit: int = Query(50, ge=1, le=500, description="Maximum number of books per page"),
+    after: Optional[str] = Query(None, description="The next_cursor returned by the previous page"),
+    all_books: bool = Query(False, alias="all", description="Return every book in one unpaginated list"),
+    fields: Optional[str] = FIELDS_QUERY,
+    author: Optional[str] = Query(None, description="Only books by exactly this author"),
+    year_from: Optional[int] = Query(None, description="Only books published in or after this year"),
+    year_to: Optional[int] = Query(None, description="Only books published in or before this year"),
+    sort: Optional[BookSort] = Query(None, description="Sort order (default id); prefix with - for descending"),
+    include: Optional[Literal["reviews"]] = INCLUDE_QUERY,
+    reviews_limit: int = REVIEWS_LIMIT_QUERY,
+    if_none_match: Optional[str] = Header(None),
+    service: AsyncBookService = Depends(get_book_service),
+):
+    columns = parse_fields(fields)
+    check_include(include, columns)
+    filters = BookFilters(author=author, year_from=year_from, year_to=year_to)
+
+    # The listing is fully determined by the books (and embedded reviews) table versions
+    # and the query string, so a matching If-None-Match is answered before any book is read.
+    version = await service.get_version("books", "reviews") if include else await service.get_version()
+    etag = make_etag("books", version, request.url.query)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
+    # Full rows take the fast path unless reviews are embedded, which needs Book objects
+    fast = columns is not None or (BOOK_FAST_JSON and not include)
+    query_columns = columns if columns is not None or not fast else list(BOOK_FIELDS)
+    if all_books:
+        books = await service.get_books(query_columns, filters, sort)
+        if fast:
+            return json_response(BOOK_ROWS.dump_json([book._asdict() for book in books]), etag)
+        if include:
+            await service.attach_reviews(books, reviews_limit)
+            body = BOOKS_WITH_REVIEWS.dump_json(BOOKS_WITH_REVIEWS.validate_python(books, from_attributes=True))
+            return json_response(body, etag)
+        return books
+    try:
+        books, next_cursor = await service.get_books_page(limit, after, query_columns, filters, sort or "id")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if fast:
+        # Also the only way to return partial rows, which do not fit BookResponse
+        page = {"items": [book._asdict() for book in books], "next_cursor": next_cursor}
+        return json_response(BOOK_ROW_PAGE.dump_json(page), etag)
+    if include:
+        # Serialized here, as BookPage would drop the embedded reviews
+        await service.attach_reviews(books, reviews_limit)
+        page = BookWithReviewsPage.model_validate({"items": books, "next_cursor": next_cursor})
+        return json_response(page.model_dump_json(), etag)
+    return {"items": books, "next_cursor": next_cursor}
+
+def parse_ids(ids: str) -> list[int]:
+    """
+    Parse a comma-separated ?ids= list into book ids.
+    """
+    try:
+        book_ids = [int(book_id) for book_id in ids.split(",") if book_id.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid ids {ids!r}; expected comma-separated integers")
+    if not book_ids or len(book_ids) > BOOK_BATCH_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"Give between 1 and {BOOK_BATCH_MAX_IDS} ids")
+    return book_ids
+
+async def batch_response(book_ids: list[int], fields: Optional[str], service: AsyncBookService):
+    columns = parse_fields(fields)
+    books, missing = await service.get_books_by_ids(book_ids, columns)
+    if columns is not None:
+        return json_response(BOOK_ROW_BATCH.dump_json({"items": [book._asdict() for book in books], "missing": missing}))
+    return {"items": books, "missing": missing}
+
+@router.get("/batch", response_model=BookBatch)
+async def get_books_batch(
+    ids: str = Query(..., description=f"Comma-separated book ids (at most {BOOK_BATCH_MAX_IDS}), e.g. 1,2,3"),
+    fields: Optional[str] = FIELDS_QUERY,
+    service: AsyncBookService = Depends(get_book_service),
+):
+    """
+    Look up many books in one request and one query. Books come back in the
+    requested order and ids without a book are listed in `missing`.
+    """
+    return await batch_response(parse_ids(ids), fields, service)
+
+@router.post("/batch", response_model=BookBatch)
+async def post_books_batch(
+    request: BookBatchRequest,
+    fields: Optional[str] = FIELDS_QUERY,
+    service: AsyncBookService = Depends(get_book_service),
+):
+    """
+    Same as GET /books/batch, with the ids in the body for lists too long for a URL.
+    """
+    return await batch_response(request.ids, fields, service)
+
+@router.get("/search", response_model=list[BookSearchResult])
+async def search_books(
+    q: str = Query(..., min_length=1, max_length=200, description="Words to look for in title, author and description"),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of results"),
+    service: AsyncBookService = Depends(get_book_service),
+):
+    """
+    Keyword search answered locally from the SQLite FTS5 index, best matches first.
+    """
+    return await service.search_books(q, limit)
+
+def export_ndjson(chunk_size: int):
+    """
+    Yield the whole catalog as NDJSON, one chunk of lines per batch of rows.
+
+    The body is streamed after the request's dependencies have been closed,
+    so the export opens and closes its own session.
+    """
     db = SessionLocal()
     try:
-        yield db
+        lines = []
+        for book in BookService(db).iter_books(chunk_size):
+            lines.append(BookResponse.model_validate(book).model_dump_json())
+            if len(lines) >= chunk_size:
+                yield "\n".join(lines) + "\n"
+                lines = []
+        if lines:
+            yield "\n".join(lines) + "\n"
     finally:
         db.close()
 
-# 2) Dependency to get a BookService instance
-def get_book_service(db: Session = Depends(get_db)) -> BookService:
-    return BookService(db)
+@router.get("/export")
+def export_books(
+    format: Literal["ndjson"] = Query("ndjson", description="Export format"),
+    chunk_size: int = Query(1000, ge=1, le=10000, description="Rows fetched from the database per batch"),
+):
+    return StreamingResponse(
+        export_ndjson(chunk_size),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="books.ndjson"'},
+    )
 
-@router.get("/", response_model=list[BookResponse])
-def get_books(service: BookService = Depends(get_book_service)):
-    return service.get_books()
+def book_body(book) -> bytes:
+    """The JSON body of GET /books/{book_id}."""
+    return BookResponse.model_validate(book).model_dump_json().encode("utf-8")
+
+def book_etag(book, body: bytes) -> str:
+    """
+    The ETag of a book body: its hash, prefixed with the book's id and version when
+    the body was read with them, so If-Match can compare-and-swap on that version.
+    """
+    version = getattr(book, "version", None)
+    if version is None:
+        return make_etag(body)
+    return versioned_etag(book.id, version, body)
 
 @router.get("/{book_id}", response_model=BookResponse)
-def get_book(book_id: int, service: BookService = Depends(get_book_service)):
-    book = service.get_book(book_id)
+async def get_book(
+    book_id: int,
+    fields: Optional[str] = FIELDS_QUERY,
+    include: Optional[Literal["reviews"]] = INCLUDE_QUERY,
+    reviews_limit: int = REVIEWS_LIMIT_QUERY,
+    if_none_match: Optional[str] = Header(None),
+    service: AsyncBookService = Depends(get_book_service),
+):
+    columns = parse_fields(fields)
+    check_include(include, columns)
+    if columns is not None:
+        book = await service.get_book_fields(book_id, columns)
+    elif include:
+        book = await service.get_book(book_id)
+    else:
+        book = await service.get_cached_book(book_id)
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
-    return book
+    # Serialize once, both to hash the ETag and as the response body
+    if columns is not None:
+        body = BOOK_ROW.dump_json(book._asdict())
+    elif include:
+        await service.attach_reviews([book], reviews_limit)
+        body = BookWithReviews.model_validate(book).model_dump_json().encode("utf-8")
+    else:
+        body = book_body(book)
+    etag = book_etag(book, body)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
 
-@router.post("/", response_model=BookResponse)
-def add_book(book: BookCreate, service: BookService = Depends(get_book_service)):
-    return service.add_book(book)
+@router.post("/", response_model=BookResponse, dependencies=[Depends(require_admin)])
+async def add_book(book: BookCreate, service: AsyncBookService = Depends(get_book_service)):
+    return await service.add_book(book)
 
-@router.put("/{book_id}", response_model=BookResponse)
-def update_book(book_id: int, updated_book: BookCreate, service: BookService = Depends(get_book_service)):
-    book = service.update_book(book_id, updated_book)
+def parse_bulk_body(body: bytes, content_type: str) -> list:
+    """
+    Split a bulk request body into raw items: a JSON array, or one JSON document
+    per line for NDJSON. Lines that are not valid JSON are returned as the
+    exception raised while decoding them.
+    """
+    if "ndjson" in content_type:
+        items = []
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError as e:
+                items.append(e)
+        return items
+    items = json.loads(body)
+    if not isinstance(items, list):
+        raise ValueError("Expected a JSON array of books")
+    return items
+
+@router.post("/bulk", response_model=BookBulkResult, dependencies=[Depends(require_admin)])
+async def add_books_bulk(
+    request: Request,
+    chunk_size: int = Query(500, ge=1, le=5000, description="Rows per batched INSERT statement"),
+    service: AsyncBookService = Depends(get_book_service),
+):
+    """
+    Add many books at once from a JSON array or an NDJSON (application/x-ndjson) body.
+
+    Every item is validated on its own: invalid items are reported in `errors`
+    by their position in the request and the valid ones are still inserted.
+    """
+    try:
+        items = parse_bulk_body(await request.body(), request.headers.get("content-type", ""))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid bulk body: {e}")
+
+    books, indexes, errors = [], [], []
+    for index, item in enumerate(items):
+        if isinstance(item, ValueError):
+            errors.append({"index": index, "errors": [{"type": "json_invalid", "msg": str(item)}]})
+            continue
+        try:
+            books.append(BookCreate.model_validate(item))
+            indexes.append(index)
+        except ValidationError as e:
+            errors.append({"index": index, "errors": e.errors(include_url=False, include_context=False, include_input=False)})
+
+    ids = await service.add_books(books, chunk_size) if books else []
+    created = [{"index": index, "id": book_id} for index, book_id in zip(indexes, ids)]
+    return {"created": created, "errors": errors}
+
+@router.put("/{book_id}", response_model=BookResponse, dependencies=[Depends(require_admin)])
+async def update_book(
+    book_id: int,
+    updated_book: BookCreate,
+    version: Optional[int] = Query(None, description="Only update the book while it is at this version"),
+    if_match: Optional[str] = Header(None, description="Only update the book while it still has this ETag"),
+    service: AsyncBookService = Depends(get_book_service),
+):
+    """
+    Replace a book. With `version` or `If-Match`, the update is applied only if nobody
+    updated the book in between (optimistic concurrency); otherwise it fails with 409.
+    """
+    if if_match is not None and version is None and if_match.strip() != "*":
+        # The book's ETag carries its version, so If-Match is the same compare-and-swap
+        version = etag_version(if_match, book_id)
+        if version is None:
+            raise HTTPException(status_code=409, detail="If-Match does not name a version of this book; fetch it again and retry")
+    try:
+        book = await service.update_book(book_id, updated_book, version)
+    except VersionConflict as e:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Book was modified since it was read: it is now at version {e.current_version}",
+        )
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
     return book
 
-@router.delete("/{book_id}")
-def delete_book(book_id: int, service: BookService = Depends(get_book_service)):
-    success = service.delete_book(book_id)
+@router.delete("/{book_id}", dependencies=[Depends(require_admin)])
+async def delete_book(book_id: int, service: AsyncBookService = Depends(get_book_service)):
+    success = await service.delete_book(book_id)
     if not success:
         raise HTTPException(status_code=404, detail="Book not found")
     return {"message": "Book deleted successfully"}
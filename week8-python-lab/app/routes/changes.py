@@ -0,0 +1,37 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.db import AsyncSessionLocal
+from app.models.change import ChangePage
+from app.services.change_service import AsyncChangeService
+
+router = APIRouter()
+
+# 1) Dependency to get the async DB session
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# 2) Dependency to get an AsyncChangeService instance
+def get_change_service(db: AsyncSession = Depends(get_db)) -> AsyncChangeService:
+    return AsyncChangeService(db)
+
+@router.get("/", response_model=ChangePage)
+async def get_changes(
+    since: Optional[str] = Query(None, description="The next_cursor of the previous batch; omit to start from the first change"),
+    limit: int = Query(500, ge=1, le=5000, description="Maximum number of changes per batch"),
+    service: AsyncChangeService = Depends(get_change_service),
+):
+    """
+    Creates, updates and deletes of books and reviews since a cursor, oldest first.
+
+    Deletes are tombstones that only carry the ids. To keep a copy in sync, apply each
+    batch and store its next_cursor; fetch again with it while has_more is true, or later
+    to pick up new changes.
+    """
+    try:
+        changes, next_cursor, has_more = await service.get_changes(since, limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"items": changes, "next_cursor": next_cursor, "has_more": has_more}
@@ -1,10 +1,14 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from app.services.chroma_service import ChromaService
+from app.services.cognito_service import require_roles, CognitoAdminRole
 
 router = APIRouter()
+
+# Writes to the vector store need a verified token in the admins group
+require_admin = require_roles(CognitoAdminRole)
 chroma_service = ChromaService()
 
-@router.post("/")
+@router.post("/", dependencies=[Depends(require_admin)])
 def add_book_to_chromadb(book_id: str, title: str, description: str):
     """
     Add a book's title and description to ChromaDB for embedding.
@@ -37,7 +41,7 @@ def ai_search_books_in_chromadb(query: str, distance_threshold: float = 1.0):
     response = chroma_service.generate_natural_language_response(query, results)
     return {"query": query, "response": response}
 
-@router.delete("/{book_id}")
+@router.delete("/{book_id}", dependencies=[Depends(require_admin)])
 def delete_book(book_id: str):
     """
     Delete a book's vector and metadata from ChromaDB by its ID.
@@ -0,0 +1,26 @@
+from fastapi import APIRouter
+from app.services.book_service import book_cache
+from app.services.cognito_service import claims_cache, cognito_executor
+
+router = APIRouter()
+
+@router.get("/book-cache")
+def get_book_cache_stats():
+    """
+    Hit, miss and eviction counters of the single-book cache, for sizing BOOK_CACHE_SIZE and BOOK_CACHE_TTL.
+    """
+    return book_cache.stats()
+
+@router.get("/claims-cache")
+def get_claims_cache_stats():
+    """
+    Hit, miss and eviction counters of the verified-claims cache, for sizing COGNITO_CLAIMS_CACHE_SIZE.
+    """
+    return claims_cache.stats()
+
+@router.get("/cognito")
+def get_cognito_stats():
+    """
+    Queue depth, queue wait and call latency of the Cognito executor, for sizing COGNITO_MAX_WORKERS and COGNITO_MAX_QUEUE.
+    """
+    return cognito_executor.stats()
@@ -1,76 +1,99 @@
-from fastapi import APIRouter, Depends, HTTPException, Security
-from sqlalchemy.orm import Session
+from typing import Optional, Union
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.db import SessionLocal
-from app.models.review import ReviewCreate, ReviewResponse
-from app.services.review_service import ReviewService
+from app.db.db import AsyncSessionLocal
+from app.models.review import ReviewCreate, ReviewResponse, ReviewPage
+from app.services.review_service import AsyncReviewService
+from app.services.book_service import VersionConflict
 from app.models.book import Book
 from app.models.review import Review
-from app.services.cognito_service import CognitoService, bearer_scheme, CognitoUserRole
+from app.services.cognito_service import require_roles, CognitoUserRole
+from app.utils.etag import make_etag, etag_matches
 
 router = APIRouter()
 
-cognito_service = CognitoService()
+# Review writes need a verified token in the users group
+require_user = require_roles(CognitoUserRole)
 
 
-# 1) Dependency to get the DB session
-def get_db():
-    db = SessionLocal()
-    try:
+# 1) Dependency to get the async DB session
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
-# 2) Dependency to get a ReviewService instance
-def get_review_service(db: Session = Depends(get_db)) -> ReviewService:
-    return ReviewService(db)
+# 2) Dependency to get an AsyncReviewService instance
+def get_review_service(db: AsyncSession = Depends(get_db)) -> AsyncReviewService:
+    return AsyncReviewService(db)
 
-@router.get("/books/{book_id}/reviews", response_model=list[ReviewResponse])
-def get_reviews(
+@router.get("/books/{book_id}/reviews", response_model=Union[ReviewPage, list[ReviewResponse]])
+async def get_reviews(
     book_id: int,
-    service: ReviewService = Depends(get_review_service)
+    request: Request,
+    response: Response,
+    limit: int = Query(50, ge=1, le=500, description="Maximum number of reviews per page"),
+    after: Optional[str] = Query(None, description="The next_cursor returned by the previous page"),
+    all_reviews: bool = Query(False, alias="all", description="Return every review in one unpaginated list"),
+    if_none_match: Optional[str] = Header(None),
+    service: AsyncReviewService = Depends(get_review_service)
 ):
-    reviews = service.get_reviews_by_book_id(book_id)
-    if not reviews:
+    # The reviews table version changes on every review write, so a matching
+    # If-None-Match is answered before the reviews are read or serialized.
+    etag = make_etag("reviews", await service.get_version(), book_id, request.url.query)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
+    if all_reviews:
+        reviews = await service.get_reviews_by_book_id(book_id)
+        if not reviews:
+            raise HTTPException(status_code=404, detail=f"No reviews found for book {book_id}")
+        return reviews
+    try:
+        reviews, next_cursor = await service.get_reviews_page(book_id, limit, after)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not reviews and after is None:
         raise HTTPException(status_code=404, detail=f"No reviews found for book {book_id}")
-    return reviews
+    return {"items": reviews, "next_cursor": next_cursor}
 
-@router.post("/books/{book_id}/reviews", response_model=ReviewResponse)
-def add_review(
+@router.post("/books/{book_id}/reviews", response_model=ReviewResponse, dependencies=[Depends(require_user)])
+async def add_review(
     book_id: int,
     review: ReviewCreate,
-    token: str = Security(bearer_scheme),
-    service: ReviewService = Depends(get_review_service),
+    service: AsyncReviewService = Depends(get_review_service),
 ):
-    # Decode and validate the access token
-    claims = cognito_service.decode_token(token.credentials)
-    cognito_service.check_user_role(claims, CognitoUserRole)
-
-    # Proceed with adding the review
-    new_review = service.add_review(book_id, review)
+    new_review = await service.add_review(book_id, review)
     if not new_review:
         raise HTTPException(status_code=404, detail=f"Book with id {book_id} not found")
     return new_review
 
-@router.put("/books/{book_id}/reviews/{review_id}", response_model=ReviewResponse)
-def update_review(
+@router.put("/books/{book_id}/reviews/{review_id}", response_model=ReviewResponse, dependencies=[Depends(require_user)])
+async def update_review(
     book_id: int,
     review_id: int,
     new_review: ReviewCreate,
-    service: ReviewService = Depends(get_review_service),
+    version: Optional[int] = Query(None, description="Only update the review while it is at this version"),
+    service: AsyncReviewService = Depends(get_review_service),
 ):
-    updated_review = service.update_review(book_id, review_id, new_review)
+    try:
+        updated_review = await service.update_review(book_id, review_id, new_review, version)
+    except VersionConflict as e:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Review was modified since it was read: it is now at version {e.current_version}",
+        )
     if not updated_review:
         raise HTTPException(status_code=404, detail=f"Review with id {review_id} for book {book_id} not found")
     return updated_review
 
-@router.delete("/books/{book_id}/reviews/{review_id}")
-def delete_review(
+@router.delete("/books/{book_id}/reviews/{review_id}", dependencies=[Depends(require_user)])
+async def delete_review(
     book_id: int,
     review_id: int,
-    service: ReviewService = Depends(get_review_service),
+    service: AsyncReviewService = Depends(get_review_service),
 ):
-    success = service.delete_review(book_id, review_id)
+    success = await service.delete_review(book_id, review_id)
     if not success:
         raise HTTPException(status_code=404, detail=f"Review with id {review_id} for book {book_id} not found")
     return {"message": "Review deleted successfully"}
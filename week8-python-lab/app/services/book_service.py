@@ -1,18 +1,256 @@
-from sqlalchemy.orm import Session
-from app.models.book import Book, BookCreate
+import html
+import operator
+import os
+import re
+from collections import defaultdict
+from typing import Optional
+from dotenv import load_dotenv
+from sqlalchemy import delete, func, insert, select, text, tuple_, update
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.orm.attributes import set_committed_value
+from app.db.async_service import AsyncService
+from app.models.book import Book, BookCreate, BookResponse, BookFilters, BookSearchResult
+from app.models.review import Review
+from app.models.table_version import TableVersion
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.utils.ttl_cache import TTLCache
+
+load_dotenv()
+
+# Control characters FTS5 wraps matched terms in, so the stored text can be HTML-escaped
+# before they become <mark></mark> tags (a stray one in book text only yields a <mark>).
+MARK_START, MARK_END = "\x02", "\x03"
+
+
+def highlight(snippet: str) -> str:
+    """HTML-escape an FTS5 snippet, then turn its match markers into <mark></mark>."""
+    return html.escape(snippet).replace(MARK_START, "<mark>").replace(MARK_END, "</mark>")
+
+
+# In-process read-through cache of BookResponse objects keyed by book id,
+# invalidated by this process's writes and bounded in staleness by the TTL.
+book_cache = TTLCache(
+    maxsize=int(os.getenv("BOOK_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("BOOK_CACHE_TTL", "60")),
+)
+
+# Keyset columns for each sort, always ending in id so the order is total
+BOOK_SORT_KEYS = {
+    "id": [Book.id],
+    "year": [Book.year, Book.id],
+    "review_count": [Book.review_count, Book.id],
+}
+
+class VersionConflict(Exception):
+    """An update asked for a row version that has since been replaced by another update."""
+    def __init__(self, entity: str, entity_id: int, current_version: int):
+        super().__init__(f"{entity.capitalize()} {entity_id} is at version {current_version}")
+        self.entity = entity
+        self.entity_id = entity_id
+        self.current_version = current_version
 
 class BookService:
     def __init__(self, db: Session):
         self.db = db
 
-    def get_books(self):
-        """Retrieve all books."""
-        return self.db.query(Book).all()
+    def _query(self, fields: Optional[list[str]] = None, keys=(Book.id,)):
+        """
+        Start a query over books. With `fields`, only those columns and the sort `keys`
+        are selected, and rows come back as named tuples instead of Book objects.
+        """
+        if fields is None:
+            return self.db.query(Book)
+        names = dict.fromkeys([column.key for column in keys] + fields)
+        return self.db.query(*(getattr(Book, name) for name in names))
+
+    def _conditions(self, filters: Optional[BookFilters]) -> list:
+        """Translate listing filters into WHERE conditions."""
+        conditions = []
+        if filters is not None:
+            if filters.author is not None:
+                conditions.append(Book.author == filters.author)
+            if filters.year_from is not None:
+                conditions.append(Book.year >= filters.year_from)
+            if filters.year_to is not None:
+                conditions.append(Book.year <= filters.year_to)
+        return conditions
+
+    def get_books(
+        self,
+        fields: Optional[list[str]] = None,
+        filters: Optional[BookFilters] = None,
+        sort: Optional[str] = None,
+    ):
+        """Retrieve all books matching `filters`, optionally sorted and only the given columns."""
+        keys = BOOK_SORT_KEYS[sort.lstrip("-")] if sort else (Book.id,)
+        query = self._query(fields, keys)
+        conditions = self._conditions(filters)
+        if conditions:
+            query = query.filter(*conditions)
+        if sort:
+            query = query.order_by(*(key.desc() if sort.startswith("-") else key for key in keys))
+        return query.all()
+
+    def get_version(self, *tables: str) -> int:
+        """
+        Return the books table version, bumped by a trigger on every write to it.
+
+        With `tables`, return the sum of those tables' versions instead; since each
+        only ever grows, the sum changes whenever any of the tables is written.
+        """
+        names = tables or (Book.__tablename__,)
+        return self.db.query(func.sum(TableVersion.version)).filter(TableVersion.name.in_(names)).scalar() or 0
+
+    def attach_reviews(self, books: list, limit: int):
+        """
+        Load up to `limit` reviews (in id order) of each of `books` with a single query,
+        and set them as each book's `Book.reviews` collection.
+
+        Like selectinload, the reviews of every book come from one WHERE book_id IN (...)
+        query, but a ROW_NUMBER() window caps them per book, read off the (book_id, id) index.
+        """
+        if not books:
+            return books
+        numbered = (
+            select(Review, func.row_number().over(partition_by=Review.book_id, order_by=Review.id).label("position"))
+            .where(Review.book_id.in_([book.id for book in books]))
+            .subquery()
+        )
+        capped = aliased(Review, numbered)
+        reviews = defaultdict(list)
+        for review in self.db.scalars(select(capped).where(numbered.c.position <= limit)):
+            reviews[review.book_id].append(review)
+        for book in books:
+            set_committed_value(book, "reviews", reviews[book.id])
+        return books
+
+    def _page_query(
+        self,
+        limit: int,
+        after: Optional[str] = None,
+        fields: Optional[list[str]] = None,
+        filters: Optional[BookFilters] = None,
+        sort: str = "id",
+    ):
+        """
+        Build the query for one page: `limit + 1` rows in `sort` order that match
+        `filters` and come after the `after` cursor.
+
+        The cursor holds the sort key of the previous page's last row, so the page
+        is a range read on the matching index rather than an OFFSET scan.
+        """
+        descending = sort.startswith("-")
+        keys = BOOK_SORT_KEYS[sort.lstrip("-")]
+        conditions = self._conditions(filters)
+        if after is not None:
+            values = decode_cursor(after, sort, len(keys))
+            if not all(isinstance(value, key.type.python_type) for key, value in zip(keys, values)):
+                raise ValueError(f"Invalid cursor: {after!r}")
+            compare = operator.lt if descending else operator.gt
+            if len(keys) == 1:
+                conditions.append(compare(keys[0], values[0]))
+            else:
+                conditions.append(compare(tuple_(*keys), tuple_(*values)))
+
+        query = self._query(fields, keys)
+        if conditions:
+            query = query.filter(*conditions)
+        order = [key.desc() if descending else key for key in keys]
+        return query.order_by(*order).limit(limit + 1)
+
+    def get_books_page(
+        self,
+        limit: int,
+        after: Optional[str] = None,
+        fields: Optional[list[str]] = None,
+        filters: Optional[BookFilters] = None,
+        sort: str = "id",
+    ):
+        """
+        Retrieve the next `limit` books matching `filters` in `sort` order, starting
+        after the `after` cursor, optionally only the given columns.
+
+        Only `limit + 1` rows are read off the matching index, whatever the table size.
+
+        :return: Tuple of (books, next_cursor); next_cursor is None on the last page.
+        :raises ValueError: If `after` is not a cursor returned by a previous page.
+        """
+        books = self._page_query(limit, after, fields, filters, sort).all()
+        if len(books) <= limit:
+            return books, None
+        books = books[:limit]
+        keys = BOOK_SORT_KEYS[sort.lstrip("-")]
+        return books, encode_cursor(sort, *(getattr(books[-1], key.key) for key in keys))
+
+    def iter_books(self, chunk_size: int = 1000):
+        """
+        Iterate over every book in id order, fetching `chunk_size` rows at a time
+        so memory stays flat however large the table is.
+        """
+        return self.db.query(Book).order_by(Book.id).yield_per(chunk_size)
+
+    def search_books(self, query: str, limit: int = 20):
+        """
+        Full-text search over title, author and description using the books_fts index.
+
+        Every word in `query` must match (case- and accent-insensitive). Results are
+        ranked by BM25, weighting title over author over description.
+
+        :return: List of BookSearchResult with id, title, author, year, snippet and rank. The
+                 snippet is HTML-escaped, with only its <mark></mark> tags left as markup.
+        """
+        terms = re.findall(r"\w+", query)
+        if not terms:
+            return []
+        # Quote each term so user input is never parsed as FTS5 query syntax
+        match = " ".join(f'"{term}"' for term in terms)
+        rows = self.db.execute(
+            text("""
+                SELECT books.id, books.title, books.author, books.year,
+                       snippet(books_fts, -1, :mark_start, :mark_end, '…', 16) AS snippet,
+                       bm25(books_fts, 10.0, 5.0, 1.0) AS rank
+                FROM books_fts JOIN books ON books.id = books_fts.rowid
+                WHERE books_fts MATCH :match
+                ORDER BY rank
+                LIMIT :limit
+            """),
+            {"match": match, "limit": limit, "mark_start": MARK_START, "mark_end": MARK_END},
+        ).all()
+        return [BookSearchResult(**{**row._mapping, "snippet": highlight(row.snippet)}) for row in rows]
 
     def get_book(self, book_id: int):
         """Retrieve a book by ID."""
         return self.db.query(Book).filter(Book.id == book_id).first()
 
+    def get_book_fields(self, book_id: int, fields: list[str]):
+        """Retrieve only the given columns (and id) of a book by ID."""
+        return self._query(fields).filter(Book.id == book_id).first()
+
+    def get_books_by_ids(self, book_ids: list[int], fields: Optional[list[str]] = None):
+        """
+        Retrieve many books by ID with a single WHERE id IN (...) query.
+
+        :return: The books found, in the order their ids were requested (each id once),
+                 and the requested ids that have no book.
+        """
+        book_ids = list(dict.fromkeys(book_ids))
+        rows = self._query(fields).filter(Book.id.in_(book_ids)).all() if book_ids else []
+        found = {row.id: row for row in rows}
+        books = [found[book_id] for book_id in book_ids if book_id in found]
+        missing = [book_id for book_id in book_ids if book_id not in found]
+        return books, missing
+
+    def get_cached_book(self, book_id: int):
+        """Retrieve a book by ID as a BookResponse, from the cache when possible."""
+        book = book_cache.get(book_id)
+        if book is None:
+            row = self.get_book(book_id)
+            if not row:
+                return None
+            book = BookResponse.model_validate(row)
+            book_cache.set(book_id, book)
+        return book
+
     def add_book(self, book_data: BookCreate):
         """Add a new book."""
         new_book = Book(**book_data.model_dump())
@@ -21,23 +259,120 @@ class BookService:
         self.db.refresh(new_book)
         return new_book
 
-    def update_book(self, book_id: int, updated_data: BookCreate):
-        """Update an existing book."""
-        book = self.get_book(book_id)
+    def add_books(self, books: list[BookCreate], chunk_size: int = 500):
+        """
+        Add many books in a single transaction using batched INSERT ... RETURNING
+        statements of `chunk_size` rows each.
+
+        :return: The ids of the new books, in the same order as `books`.
+        """
+        rows = [book.model_dump() for book in books]
+        statement = insert(Book).returning(Book.id, sort_by_parameter_order=True)
+        ids = []
+        for start in range(0, len(rows), chunk_size):
+            ids.extend(self.db.scalars(statement, rows[start:start + chunk_size]).all())
+        self.db.commit()
+        return ids
+
+    def update_book(self, book_id: int, updated_data: BookCreate, version: Optional[int] = None):
+        """
+        Update an existing book with a single UPDATE ... RETURNING statement, bumping its version.
+
+        With `version`, the update is a compare-and-swap: it only applies while the
+        book is still at that version, so no lock is held between read and write.
+
+        :return: The updated book, or None if there is no book with this ID.
+        :raises VersionConflict: If the book exists but is no longer at `version`.
+        """
+        conditions = [Book.id == book_id]
+        if version is not None:
+            conditions.append(Book.version == version)
+        book = self.db.scalars(
+            update(Book)
+            .where(*conditions)
+            .values(**updated_data.model_dump(), version=Book.version + 1)
+            .returning(Book)
+            # Refresh only the returned row instead of scanning the whole identity map
+            .execution_options(synchronize_session=False, populate_existing=True)
+        ).first()
         if not book:
+            if version is not None:
+                current = self.db.query(Book.version).filter(Book.id == book_id).scalar()
+                if current is not None:
+                    raise VersionConflict("book", book_id, current)
             return None
-        for key, value in updated_data.model_dump().items():
-            setattr(book, key, value)
         self.db.commit()
-        self.db.refresh(book)
+        book_cache.invalidate(book_id)
         return book
 
     def delete_book(self, book_id: int):
-        """Delete a book by ID."""
-        book = self.get_book(book_id)
-        if not book:
+        """
+        Delete a book by ID with a single DELETE statement. Its reviews are removed
+        by the database through the ON DELETE CASCADE foreign key, without being loaded.
+
+        :return: True if the book existed.
+        """
+        result = self.db.execute(
+            delete(Book).where(Book.id == book_id).execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
             return False
-        self.db.delete(book)
         self.db.commit()
+        book_cache.invalidate(book_id)
         return True
 
+
+class AsyncBookService(AsyncService):
+    """Async counterpart of BookService for an AsyncSession."""
+    sync_service = BookService
+
+    async def get_version(self, *tables: str) -> int:
+        return await self._run(BookService.get_version, *tables)
+
+    async def attach_reviews(self, books: list, limit: int):
+        return await self._run(BookService.attach_reviews, books, limit)
+
+    async def get_books(
+        self,
+        fields: Optional[list[str]] = None,
+        filters: Optional[BookFilters] = None,
+        sort: Optional[str] = None,
+    ):
+        return await self._run(BookService.get_books, fields, filters, sort)
+
+    async def get_books_page(
+        self,
+        limit: int,
+        after: Optional[str] = None,
+        fields: Optional[list[str]] = None,
+        filters: Optional[BookFilters] = None,
+        sort: str = "id",
+    ):
+        return await self._run(BookService.get_books_page, limit, after, fields, filters, sort)
+
+    async def search_books(self, query: str, limit: int = 20):
+        return await self._run(BookService.search_books, query, limit)
+
+    async def get_book(self, book_id: int):
+        return await self._run(BookService.get_book, book_id)
+
+    async def get_book_fields(self, book_id: int, fields: list[str]):
+        return await self._run(BookService.get_book_fields, book_id, fields)
+
+    async def get_books_by_ids(self, book_ids: list[int], fields: Optional[list[str]] = None):
+        return await self._run(BookService.get_books_by_ids, book_ids, fields)
+
+    async def get_cached_book(self, book_id: int):
+        return await self._run(BookService.get_cached_book, book_id)
+
+    async def add_book(self, book_data: BookCreate):
+        return await self._run(BookService.add_book, book_data)
+
+    async def add_books(self, books: list[BookCreate], chunk_size: int = 500):
+        return await self._run(BookService.add_books, books, chunk_size)
+
+    async def update_book(self, book_id: int, updated_data: BookCreate, version: Optional[int] = None):
+        return await self._run(BookService.update_book, book_id, updated_data, version)
+
+    async def delete_book(self, book_id: int):
+        return await self._run(BookService.delete_book, book_id)
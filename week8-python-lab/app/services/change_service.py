@@ -0,0 +1,44 @@
+from typing import Optional
+from sqlalchemy.orm import Session
+from app.db.async_service import AsyncService
+from app.models.change import Change
+from app.utils.pagination import encode_cursor, decode_cursor
+
+class ChangeService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_changes(self, since: Optional[str] = None, limit: int = 500):
+        """
+        Retrieve up to `limit` changes in the order they were made, starting after the
+        `since` cursor (or from the first change).
+
+        :return: Tuple of (changes, next_cursor, has_more). next_cursor resumes after
+                 this batch, and after `since` again if there was nothing new.
+        :raises ValueError: If `since` is not a cursor returned by the feed.
+        """
+        last_seq = 0
+        if since is not None:
+            (last_seq,) = decode_cursor(since, "seq", 1)
+            if not isinstance(last_seq, int):
+                raise ValueError(f"Invalid cursor: {since!r}")
+        changes = (
+            self.db.query(Change)
+            .filter(Change.seq > last_seq)
+            .order_by(Change.seq)
+            .limit(limit + 1)
+            .all()
+        )
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+        if changes:
+            last_seq = changes[-1].seq
+        return changes, encode_cursor("seq", last_seq), has_more
+
+
+class AsyncChangeService(AsyncService):
+    """Async counterpart of ChangeService for an AsyncSession."""
+    sync_service = ChangeService
+
+    async def get_changes(self, since: Optional[str] = None, limit: int = 500):
+        return await self._run(ChangeService.get_changes, since, limit)
@@ -1,22 +1,47 @@
+import logging
 import os
-from jose import jwt
+import threading
+import time
+from functools import lru_cache
+from jose import jwk, jwt
 from jose.exceptions import JWTError
 import boto3
+from botocore.config import Config
 import hmac
 import hashlib
 import base64
-from fastapi import HTTPException, Depends
+from fastapi import HTTPException, Depends, Request, Security
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import requests
 from dotenv import load_dotenv
 
+from app.services.local_cognito import get_local_cognito
+from app.utils.bounded_executor import BoundedExecutor, ExecutorFull
+from app.utils.ttl_cache import TTLCache
+
 load_dotenv()
 
+logger = logging.getLogger(__name__)
 
 CognitoUserRole = os.getenv("COGNITO_USER_ROLE", "Users")
 CognitoAdminRole = os.getenv("COGNITO_ADMIN_ROLE", "Admins")
 bearer_scheme = HTTPBearer()
 
+# Blocking Cognito API calls run here rather than in the shared threadpool, so a burst of
+# logins cannot starve other routes; calls beyond the queue are rejected (503 at the route).
+cognito_executor = BoundedExecutor(
+    max_workers=int(os.getenv("COGNITO_MAX_WORKERS", "16")),
+    max_queue=int(os.getenv("COGNITO_MAX_QUEUE", "64")),
+    name="cognito",
+)
+
+# Verified claims keyed by the SHA-256 of the token, so a repeated token skips the
+# JOSE parsing and RSA verification. An entry never outlives the token's exp.
+claims_cache = TTLCache(
+    maxsize=int(os.getenv("COGNITO_CLAIMS_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("COGNITO_CLAIMS_CACHE_TTL", "300")),
+)
+
 class CognitoService:
     def __init__(self):
         self.region = os.getenv("COGNITO_REGION")
@@ -24,21 +49,98 @@ class CognitoService:
         self.client_id = os.getenv("COGNITO_CLIENT_ID")
         self.client_secret = os.getenv("COGNITO_CLIENT_SECRET")
         self.jwks_url = f"https://cognito-idp.{self.region}.amazonaws.com/{self.user_pool_id}/.well-known/jwks.json"
-        self.jwks_keys = self._get_cognito_jwks()
+        # Public keys by kid, fetched on first use rather than at import time
+        self.jwks_ttl = float(os.getenv("COGNITO_JWKS_TTL", "3600"))
+        self.jwks_min_refresh = float(os.getenv("COGNITO_JWKS_MIN_REFRESH", "30"))
+        self.jwks: dict = {}
+        self._jwks_fetched_at = float("-inf")
+        self._jwks_attempted_at = float("-inf")
+        self._jwks_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._refresh_thread = None
         self.bearer = HTTPBearer()
 
-        # Initialize Boto3 Cognito client
-        self.client = boto3.client("cognito-idp", region_name=self.region)
+        # COGNITO_MODE=local swaps AWS for an in-process user pool, for offline tests and benchmarks
+        self.local = None
+        if os.getenv("COGNITO_MODE", "aws") == "local":
+            self.local = get_local_cognito(self.region, self.user_pool_id, self.client_id, self.client_secret)
+            self.client = self.local.client()
+        else:
+            # Initialize Boto3 Cognito client, with a connection per executor worker and
+            # timeouts short enough that a slow Cognito cannot hold workers for long
+            self.client = boto3.client("cognito-idp", region_name=self.region, config=Config(
+                max_pool_connections=cognito_executor.max_workers,
+                connect_timeout=float(os.getenv("COGNITO_CONNECT_TIMEOUT", "2")),
+                read_timeout=float(os.getenv("COGNITO_READ_TIMEOUT", "5")),
+                retries={"max_attempts": int(os.getenv("COGNITO_MAX_ATTEMPTS", "2")), "mode": "standard"},
+                tcp_keepalive=True,
+            ))
 
     def _get_cognito_jwks(self):
         """
         Retrieve JWKS (JSON Web Key Set) for token validation from AWS Cognito.
+
+        Raises a 503 when Cognito cannot be reached or answers with an error, since a retry may succeed.
         """
-        response = requests.get(self.jwks_url)
-        if response.status_code != 200:
-            raise HTTPException(status_code=500, detail="Unable to fetch JWKS for token validation.")
+        if self.local is not None:
+            return self.local.jwks()
+        try:
+            response = requests.get(self.jwks_url, timeout=5)
+        except requests.RequestException:
+            logger.warning("Unable to fetch JWKS from %s", self.jwks_url, exc_info=True)
+            response = None
+        if response is None or response.status_code != 200:
+            raise HTTPException(status_code=503, detail="Unable to fetch JWKS for token validation.",
+                                headers={"Retry-After": "1"})
         return response.json()["keys"]
 
+    def _refresh_jwks(self, min_age: float = 0.0):
+        """
+        Fetch the JWKS and parse its public keys, unless a fetch was attempted less than `min_age` seconds ago.
+
+        Only one fetch runs at a time: callers that arrive while one is in flight wait for it
+        and then find the keys fresh, so a key rotation causes a single request to Cognito.
+        While no keys have been fetched yet, every call tries again, so a failed fetch at
+        startup does not lock out all tokens for `min_age` seconds.
+        """
+        with self._jwks_lock:
+            if self.jwks and time.monotonic() - self._jwks_attempted_at < min_age:
+                return
+            self._jwks_attempted_at = time.monotonic()
+            keys = self._get_cognito_jwks()
+            self.jwks = {key["kid"]: jwk.construct(key, key.get("alg", "RS256")) for key in keys}
+            self._jwks_fetched_at = time.monotonic()
+
+    def _refresh_jwks_quietly(self):
+        try:
+            self._refresh_jwks(self.jwks_min_refresh)
+        except Exception:
+            # The current keys stay in use; the next stale lookup tries again
+            logger.warning("Unable to refresh JWKS from %s", self.jwks_url, exc_info=True)
+
+    def _refresh_jwks_in_background(self):
+        with self._refresh_lock:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return
+            self._refresh_thread = threading.Thread(target=self._refresh_jwks_quietly, name="jwks-refresh", daemon=True)
+            self._refresh_thread.start()
+
+    def get_signing_key(self, kid: str):
+        """
+        Return the parsed public key for `kid`, or None if Cognito does not publish one.
+
+        Keys older than COGNITO_JWKS_TTL keep being used while a background thread refreshes
+        them. An unknown kid (for example after a key rotation) refetches the JWKS right away,
+        at most once every COGNITO_JWKS_MIN_REFRESH seconds.
+        """
+        key = self.jwks.get(kid)
+        if key is None:
+            self._refresh_jwks(self.jwks_min_refresh)
+            key = self.jwks.get(kid)
+        elif time.monotonic() - self._jwks_fetched_at > self.jwks_ttl:
+            self._refresh_jwks_in_background()
+        return key
+
     def validate_token(self, credentials: HTTPAuthorizationCredentials = Depends(HTTPBearer())):
         """
         Validate and decode a JWT token issued by AWS Cognito.
@@ -46,28 +148,61 @@ class CognitoService:
         :param credentials: HTTPAuthorizationCredentials (token from the Authorization header).
         :return: The decoded token payload.
         """
-        token = credentials.credentials
+        return self.verify_token(credentials.credentials)
+
+    def verify_token(self, token: str) -> dict:
+        """
+        Verify a JWT token's signature, audience and issuer against Cognito's JWKS and return its claims.
+
+        Verified claims are cached by the token's hash until the token expires (or the cache's
+        TTL passes), so a client that sends the same token again is not verified again.
+        Tokens that fail verification are not cached.
+        """
+        cache_key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+        claims = claims_cache.get(cache_key)
+        if claims is not None:
+            return dict(claims)
+        return self._verify_and_cache(token, cache_key)
+
+    async def verify_token_async(self, token: str) -> dict:
+        """
+        verify_token for async code: cached claims are returned inline, but a cache miss
+        (RS256 verification, and possibly a blocking JWKS fetch) runs on the Cognito executor,
+        so it never stalls the event loop or the threadpool the routes share.
+
+        Raises ExecutorFull when the executor's queue is full.
+        """
+        cache_key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+        claims = claims_cache.get(cache_key)
+        if claims is not None:
+            return dict(claims)
+        return await cognito_executor.run(self._verify_and_cache, token, cache_key)
+
+    def _verify_and_cache(self, token: str, cache_key: str) -> dict:
         try:
             # Decode token using Cognito's JWKS
             headers = jwt.get_unverified_header(token)
-            kid = headers.get("kid")
-            key = next((k for k in self.jwks_keys if k["kid"] == kid), None)
-            if not key:
+            key = self.get_signing_key(headers.get("kid"))
+            if key is None:
                 raise HTTPException(status_code=401, detail="Invalid token signature.")
 
-            payload = jwt.decode(
+            claims = jwt.decode(
                 token,
                 key=key,
                 algorithms=["RS256"],
                 audience=self.client_id,
                 issuer=f"https://cognito-idp.{self.region}.amazonaws.com/{self.user_pool_id}",
             )
-            return payload
         except jwt.ExpiredSignatureError:
             raise HTTPException(status_code=401, detail="Token has expired.")
         except jwt.JWTError as e:
             raise HTTPException(status_code=401, detail=f"Token validation error: {str(e)}")
 
+        remaining = claims.get("exp", 0) - time.time()
+        if remaining > 0:
+            claims_cache.set(cache_key, claims, min(claims_cache.ttl, remaining))
+        return dict(claims)
+
     def calculate_secret_hash(self, username):
         """
         Calculate the Cognito SECRET_HASH for the given username.
@@ -116,9 +251,17 @@ class CognitoService:
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Authentication failed: {str(e)}")
         
+    async def authenticate_user_async(self, username: str, password: str):
+        """
+        authenticate_user on the Cognito executor, without blocking the event loop.
+
+        Raises ExecutorFull when the executor's queue is full.
+        """
+        return await cognito_executor.run(self.authenticate_user, username, password)
+
     def decode_token(self, token: str):
         """
-        Decode and validate a JWT token.
+        Decode a JWT token's claims WITHOUT verifying its signature; use verify_token to authorize requests.
         """
         try:
             # Decode token without verification to read claims
@@ -143,3 +286,43 @@ class CognitoService:
         except Exception as e:
             raise HTTPException(status_code=403, detail=f"Invalid token or permissions: {str(e)}")
 
+
+@lru_cache(maxsize=None)
+def get_cognito_service() -> CognitoService:
+    """The process-wide CognitoService, so every router shares its JWKS and Cognito client."""
+    return CognitoService()
+
+
+async def get_claims(request: Request, credentials: HTTPAuthorizationCredentials = Security(bearer_scheme)) -> dict:
+    """
+    Dependency that verifies the bearer token and returns its claims, also stored on request.state.claims.
+
+    FastAPI resolves it once per request however many dependencies use it, and the claims
+    cache makes a repeated token cheap across requests; a cache miss is verified on the
+    Cognito executor, off the event loop, or answered with a 503 when it is full. Tests
+    override this dependency.
+    """
+    claims = getattr(request.state, "claims", None)
+    if claims is None:
+        try:
+            claims = await get_cognito_service().verify_token_async(credentials.credentials)
+        except ExecutorFull:
+            raise HTTPException(status_code=503, detail="Too many token checks in progress, try again shortly.",
+                                headers={"Retry-After": "1"})
+        request.state.claims = claims
+    return claims
+
+
+def require_roles(*roles: str):
+    """
+    Dependency factory admitting requests whose token is in at least one of `roles` (any valid token if none).
+
+    Use it as a route parameter to receive the claims, or in `dependencies=[Depends(...)]`.
+    """
+    async def check_roles(claims: dict = Depends(get_claims)) -> dict:
+        groups = claims.get("cognito:groups", [])
+        if roles and not any(role in groups for role in roles):
+            raise HTTPException(status_code=403, detail="Insufficient permissions")
+        return claims
+    return check_roles
+
@@ -0,0 +1,125 @@
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import time
+import uuid
+from functools import lru_cache
+from types import SimpleNamespace
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+
+class NotAuthorizedException(Exception):
+    pass
+
+
+class UserNotConfirmedException(Exception):
+    pass
+
+
+def parse_users(spec: str) -> dict:
+    """
+    Parse COGNITO_LOCAL_USERS, e.g. "admin:goodpassword:Admins|Users,reader:password:Users",
+    into {username: (password, [groups])}.
+    """
+    users = {}
+    for entry in filter(None, (item.strip() for item in spec.split(","))):
+        username, password, groups = (entry.split(":", 2) + [""])[:3]
+        users[username] = (password, [group for group in groups.split("|") if group])
+    return users
+
+
+class LocalCognito:
+    """
+    An in-process stand-in for a Cognito user pool: an RSA key pair published as a JWKS,
+    RS256 ID and access tokens shaped like Cognito's, and a fixed set of users.
+
+    Tokens carry the same issuer, audience and claims CognitoService checks, so verifying
+    them costs the same as verifying real ones, but nothing leaves the process.
+    """
+    def __init__(self, region: str, user_pool_id: str, client_id: str, client_secret: str, users: dict,
+                 token_ttl: int = 3600):
+        self.issuer = f"https://cognito-idp.{region}.amazonaws.com/{user_pool_id}"
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.users = users
+        self.token_ttl = token_ttl
+        self.kid = uuid.uuid4().hex
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        # Parsed once: loading a PEM key is far slower than signing with it
+        self.signing_key = jwk.construct(private_key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        ), "RS256")
+
+    def jwks(self) -> list:
+        """The public half of the signing key, as the keys of a JWKS document."""
+        return [{**self.signing_key.public_key().to_dict(), "kid": self.kid, "use": "sig"}]
+
+    def mint_token(self, username: str, groups: list, token_use: str = "access", expires_in: int = None) -> str:
+        """Sign an ID or access token for `username` the way Cognito would."""
+        now = int(time.time())
+        claims = {
+            "sub": str(uuid.uuid5(uuid.NAMESPACE_URL, f"{self.issuer}/{username}")),
+            "cognito:groups": groups,
+            "iss": self.issuer,
+            "token_use": token_use,
+            "auth_time": now,
+            "iat": now,
+            "exp": now + (self.token_ttl if expires_in is None else expires_in),
+            "jti": uuid.uuid4().hex,
+        }
+        if token_use == "id":
+            claims.update({"aud": self.client_id, "cognito:username": username})
+        else:
+            claims.update({"client_id": self.client_id, "username": username, "scope": "aws.cognito.signin.user.admin"})
+        return jwt.encode(claims, self.signing_key, algorithm="RS256", headers={"kid": self.kid})
+
+    def client(self) -> "LocalCognitoClient":
+        return LocalCognitoClient(self)
+
+
+class LocalCognitoClient:
+    """The part of boto3's cognito-idp client that CognitoService uses, backed by a LocalCognito."""
+    exceptions = SimpleNamespace(
+        NotAuthorizedException=NotAuthorizedException,
+        UserNotConfirmedException=UserNotConfirmedException,
+    )
+
+    def __init__(self, pool: LocalCognito):
+        self.pool = pool
+
+    def initiate_auth(self, AuthFlow: str, AuthParameters: dict, ClientId: str) -> dict:
+        if AuthFlow != "USER_PASSWORD_AUTH" or ClientId != self.pool.client_id:
+            raise NotAuthorizedException("Unsupported auth flow or client id.")
+        username = AuthParameters.get("USERNAME", "")
+        expected_hash = base64.b64encode(hmac.new(
+            self.pool.client_secret.encode("utf-8"), (username + ClientId).encode("utf-8"), hashlib.sha256
+        ).digest()).decode()
+        if not hmac.compare_digest(AuthParameters.get("SECRET_HASH", ""), expected_hash):
+            raise NotAuthorizedException("Unable to verify secret hash for client.")
+        password, groups = self.pool.users.get(username, (None, []))
+        if password is None or not hmac.compare_digest(AuthParameters.get("PASSWORD", ""), password):
+            raise NotAuthorizedException("Incorrect username or password.")
+        return {
+            "AuthenticationResult": {
+                "IdToken": self.pool.mint_token(username, groups, token_use="id"),
+                "AccessToken": self.pool.mint_token(username, groups),
+                "RefreshToken": secrets.token_urlsafe(64),
+                "ExpiresIn": self.pool.token_ttl,
+                "TokenType": "Bearer",
+            }
+        }
+
+
+@lru_cache(maxsize=None)
+def get_local_cognito(region: str, user_pool_id: str, client_id: str, client_secret: str) -> LocalCognito:
+    """One LocalCognito per pool, so every CognitoService in the process shares its keys."""
+    return LocalCognito(
+        region, user_pool_id, client_id, client_secret,
+        users=parse_users(os.getenv("COGNITO_LOCAL_USERS", "admin:goodpassword:Admins|Users,user:password:Users")),
+        token_ttl=int(os.getenv("COGNITO_LOCAL_TOKEN_TTL", "3600")),
+    )
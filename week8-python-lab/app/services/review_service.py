@@ -1,43 +1,135 @@
+from typing import Optional
+from sqlalchemy import delete, insert, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from app.db.async_service import AsyncService
 from app.models.review import Review, ReviewCreate
-from app.models.book import Book
+from app.models.table_version import TableVersion
+from app.services.book_service import book_cache, VersionConflict
+from app.utils.pagination import encode_cursor, decode_cursor
 
 class ReviewService:
     def __init__(self, db: Session):
         self.db = db
 
+    def get_version(self) -> int:
+        """Return the reviews table version, bumped by a trigger on every write to it."""
+        return self.db.query(TableVersion.version).filter(TableVersion.name == Review.__tablename__).scalar() or 0
+
     def get_reviews_by_book_id(self, book_id: int):
-        return self.db.query(Review).filter(Review.book_id == book_id).all()
+        return self.db.query(Review).filter(Review.book_id == book_id).order_by(Review.id).all()
+
+    def _page_query(self, book_id: int, limit: int, after: Optional[str] = None):
+        """
+        Build the query for one page: `limit + 1` of the book's reviews in id order
+        after the `after` cursor, read as a range on the (book_id, id) index.
+        """
+        query = self.db.query(Review).filter(Review.book_id == book_id)
+        if after is not None:
+            (last_id,) = decode_cursor(after, "id", 1)
+            if not isinstance(last_id, int):
+                raise ValueError(f"Invalid cursor: {after!r}")
+            query = query.filter(Review.id > last_id)
+        return query.order_by(Review.id).limit(limit + 1)
+
+    def get_reviews_page(self, book_id: int, limit: int, after: Optional[str] = None):
+        """
+        Retrieve the next `limit` reviews of a book in id order, starting after the `after` cursor.
+
+        :return: Tuple of (reviews, next_cursor); next_cursor is None on the last page.
+        :raises ValueError: If `after` is not a cursor returned by a previous page.
+        """
+        reviews = self._page_query(book_id, limit, after).all()
+        if len(reviews) <= limit:
+            return reviews, None
+        reviews = reviews[:limit]
+        return reviews, encode_cursor("id", reviews[-1].id)
 
     def add_review(self, book_id: int, review_data: ReviewCreate):
-        # Check if the book exists
-        book = self.db.query(Book).filter(Book.id == book_id).first()
-        if not book:
+        """
+        Add a review with a single INSERT ... RETURNING statement. A missing book is
+        caught by the reviews.book_id foreign key instead of being looked up first.
+
+        :return: The new review, or None if there is no book with this ID.
+        """
+        try:
+            new_review = self.db.scalars(
+                insert(Review).values(book_id=book_id, **review_data.model_dump()).returning(Review)
+            ).one()
+        except IntegrityError:
+            self.db.rollback()
             return None
-        # Add the review
-        new_review = Review(book_id=book_id, **review_data.model_dump())
-        self.db.add(new_review)
         self.db.commit()
-        self.db.refresh(new_review)
+        # The book's review_count and last_reviewed_at were just changed by a trigger
+        book_cache.invalidate(book_id)
         return new_review
 
-    def update_review(self, book_id: int, review_id: int, new_review_data: ReviewCreate):
-        # Check if the book exists
-        book = self.db.query(Book).filter(Book.id == book_id).first()
-        if not book:
-            return None
-        # Update the review
-        review = self.db.query(Review).filter(Review.id == review_id, Review.book_id == book_id).first()
+    def update_review(self, book_id: int, review_id: int, new_review_data: ReviewCreate, version: Optional[int] = None):
+        """
+        Update a review of a book with a single UPDATE ... WHERE id=? AND book_id=? RETURNING
+        statement; `version` makes it a compare-and-swap, as in BookService.update_book.
+
+        :return: The updated review, or None if the book has no review with this ID.
+        :raises VersionConflict: If the review exists but is no longer at `version`.
+        """
+        conditions = [Review.id == review_id, Review.book_id == book_id]
+        if version is not None:
+            conditions.append(Review.version == version)
+        review = self.db.scalars(
+            update(Review)
+            .where(*conditions)
+            .values(review=new_review_data.review, version=Review.version + 1)
+            .returning(Review)
+            .execution_options(synchronize_session=False, populate_existing=True)
+        ).first()
         if not review:
+            if version is not None:
+                current = (
+                    self.db.query(Review.version)
+                    .filter(Review.id == review_id, Review.book_id == book_id)
+                    .scalar()
+                )
+                if current is not None:
+                    raise VersionConflict("review", review_id, current)
             return None
-        review.review = new_review_data.review
         self.db.commit()
         return review
 
     def delete_review(self, book_id: int, review_id: int):
-        review = self.db.query(Review).filter(Review.id == review_id, Review.book_id == book_id).first()
-        if not review:
+        """
+        Delete a review of a book with a single DELETE statement.
+
+        :return: True if the review existed, otherwise None.
+        """
+        result = self.db.execute(
+            delete(Review)
+            .where(Review.id == review_id, Review.book_id == book_id)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
             return None
-        self.db.delete(review)
         self.db.commit()
+        book_cache.invalidate(book_id)
         return True
+
+class AsyncReviewService(AsyncService):
+    """Async counterpart of ReviewService for an AsyncSession."""
+    sync_service = ReviewService
+
+    async def get_version(self) -> int:
+        return await self._run(ReviewService.get_version)
+
+    async def get_reviews_by_book_id(self, book_id: int):
+        return await self._run(ReviewService.get_reviews_by_book_id, book_id)
+
+    async def get_reviews_page(self, book_id: int, limit: int, after: Optional[str] = None):
+        return await self._run(ReviewService.get_reviews_page, book_id, limit, after)
+
+    async def add_review(self, book_id: int, review_data: ReviewCreate):
+        return await self._run(ReviewService.add_review, book_id, review_data)
+
+    async def update_review(self, book_id: int, review_id: int, new_review_data: ReviewCreate, version: Optional[int] = None):
+        return await self._run(ReviewService.update_review, book_id, review_id, new_review_data, version)
+
+    async def delete_review(self, book_id: int, review_id: int):
+        return await self._run(ReviewService.delete_review, book_id, review_id)
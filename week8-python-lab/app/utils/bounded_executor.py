@@ -0,0 +1,102 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ExecutorFull(Exception):
+    """Raised when a BoundedExecutor already holds as many calls as it may run and queue."""
+
+
+def percentiles(samples) -> dict:
+    """p50, p95, p99 and max of a sequence of seconds, in milliseconds."""
+    ordered = sorted(samples)
+    if not ordered:
+        return {"count": 0, "p50": None, "p95": None, "p99": None, "max": None}
+
+    def pick(fraction):
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 3)
+
+    return {"count": len(ordered), "p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": pick(1.0)}
+
+
+class BoundedExecutor:
+    """
+    A dedicated thread pool for blocking calls made from async code, with a cap on its queue.
+
+    At most `max_workers` calls run at once and `max_queue` more wait for a worker; a call
+    beyond that raises ExecutorFull right away instead of queueing, so callers can shed load.
+    Queue waits and run times of the last `window` calls are kept for stats().
+    """
+    def __init__(self, max_workers: int, max_queue: int, name: str = "bounded", window: int = 1024):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._waits = deque(maxlen=window)
+        self._latencies = deque(maxlen=window)
+
+    async def run(self, function, *args):
+        """Run `function(*args)` on a worker thread and await its result."""
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise ExecutorFull(f"{self._in_flight} calls are already running or queued")
+            self._in_flight += 1
+        try:
+            future = self._executor.submit(self._call, time.perf_counter(), function, *args)
+        except RuntimeError as error:
+            # Shut down: nothing was queued, so give the slot back
+            with self._lock:
+                self._in_flight -= 1
+                self.rejected += 1
+            raise ExecutorFull("the executor is shut down") from error
+        # Released when the call finishes, or when it is cancelled before a worker picks it up
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _call(self, submitted: float, function, *args):
+        started = time.perf_counter()
+        with self._lock:
+            self._running += 1
+            self._waits.append(started - submitted)
+        try:
+            result = function(*args)
+        except BaseException:
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._latencies.append(time.perf_counter() - started)
+        with self._lock:
+            self.completed += 1
+        return result
+
+    def _release(self, future):
+        with self._lock:
+            self._in_flight -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queued": self._in_flight - self._running,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "queue_wait_ms": percentiles(self._waits),
+                "latency_ms": percentiles(self._latencies),
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,189 @@
+import zlib
+from typing import Optional
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.utils.etag import encoded_etag
+
+# Brotli and zstd are optional: without their packages only gzip is offered
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Media types worth compressing; images, archives and the like already are compressed
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/x-ndjson", "application/javascript", "application/xml")
+
+
+class GzipCompressor:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress a chunk of a streamed body and flush it, so the client can decode it right away."""
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush()
+
+
+class BrotliCompressor:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.process(data) + self._compressor.finish()
+
+
+class ZstdCompressor:
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush()
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware that compresses response bodies with the best coding the client
+    accepts: zstd, then Brotli, then gzip.
+
+    Bodies smaller than `minimum_size` bytes are sent as they are. Compressing a body
+    (or a streamed chunk) of `offload_size` bytes or more runs in a worker thread, so
+    large responses do not block the event loop. Streamed responses are compressed
+    chunk by chunk. A compressed response's ETag gets the coding as a suffix, which
+    `etag_matches` ignores.
+    """
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        zstd_level: int = 3,
+        offload_size: int = 64 * 1024,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.offload_size = offload_size
+        # Codings available here, in order of preference
+        self.compressors = {}
+        if zstandard is not None:
+            self.compressors["zstd"] = lambda: ZstdCompressor(zstd_level)
+        if brotli is not None:
+            self.compressors["br"] = lambda: BrotliCompressor(brotli_quality)
+        self.compressors["gzip"] = lambda: GzipCompressor(gzip_level)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        encoding = self.choose_encoding(headers.get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        response = CompressedResponse(self, encoding, send, headers.get("if-none-match", ""))
+        await self.app(scope, receive, response.send)
+
+    def choose_encoding(self, accept_encoding: str) -> Optional[str]:
+        """Pick the preferred available coding with the highest q-value in an Accept-Encoding header."""
+        weights = {}
+        for item in accept_encoding.split(","):
+            name, _, params = item.strip().partition(";")
+            weight = 1.0
+            params = params.strip()
+            if params.startswith("q="):
+                try:
+                    weight = float(params[2:])
+                except ValueError:
+                    weight = 0.0
+            if name:
+                weights[name.strip().lower()] = weight
+        wildcard = weights.get("*", 0.0)
+        best, best_weight = None, 0.0
+        for encoding in self.compressors:
+            weight = weights.get(encoding, wildcard)
+            if weight > best_weight:
+                best, best_weight = encoding, weight
+        return best
+
+    async def run(self, function, data: bytes) -> bytes:
+        if len(data) >= self.offload_size:
+            return await anyio.to_thread.run_sync(function, data)
+        return function(data)
+
+
+class CompressedResponse:
+    """The `send` of one response, compressing its body once the first chunk shows it is worth it."""
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send, if_none_match: str = ""):
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        self.if_none_match = if_none_match
+        self.start: Optional[Message] = None
+        self.compressor = None
+        self.passthrough = False
+
+    def compressible(self, headers: MutableHeaders, body: bytes, more_body: bool) -> bool:
+        if self.start["status"] in (204, 304) or "content-encoding" in headers:
+            return False
+        if not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES):
+            return False
+        # A streamed body's size is unknown up front, so it is always compressed
+        return more_body or len(body) >= self.middleware.minimum_size
+
+    def not_modified(self, headers: MutableHeaders):
+        """A 304 repeats the ETag of the cached representation, which may be the compressed one."""
+        etag = headers.get("etag")
+        if etag and encoded_etag(etag, self.encoding) in self.if_none_match:
+            headers["ETag"] = encoded_etag(etag, self.encoding)
+
+    async def send(self, message: Message):
+        if message["type"] == "http.response.start":
+            self.start = message
+            if message["status"] == 304:
+                self.not_modified(MutableHeaders(raw=message["headers"]))
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.compressor is None:
+            headers = MutableHeaders(raw=self.start["headers"])
+            if not self.compressible(headers, body, more_body):
+                self.passthrough = True
+                await self._send(self.start)
+                await self._send(message)
+                return
+            self.compressor = self.middleware.compressors[self.encoding]()
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if "etag" in headers:
+                headers["ETag"] = encoded_etag(headers["etag"], self.encoding)
+            if not more_body:
+                body = await self.middleware.run(self.compressor.finish, body)
+                headers["Content-Length"] = str(len(body))
+                await self._send(self.start)
+                await self._send({"type": "http.response.body", "body": body})
+                return
+            del headers["Content-Length"]
+            await self._send(self.start)
+
+        compress = self.compressor.compress if more_body else self.compressor.finish
+        body = await self.middleware.run(compress, body)
+        await self._send({"type": "http.response.body", "body": body, "more_body": more_body})
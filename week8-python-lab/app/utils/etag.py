@@ -0,0 +1,77 @@
+import hashlib
+import re
+from typing import Optional
+
+# Content codings the compression middleware may apply to a response
+ENCODINGS = ("gzip", "br", "zstd")
+
+
+def make_etag(*parts) -> str:
+    """
+    Build a strong ETag from the given parts: a serialized body, or the version
+    counters and request parameters that fully determine one.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def versioned_etag(entity_id: int, version: int, *parts) -> str:
+    """
+    A strong ETag for one row that carries its id and version before the hash of
+    `parts`, e.g. "10.3-9f86d0…". The hash still changes with anything else in the
+    body, while `etag_version` reads the version back for an If-Match.
+    """
+    return f'"{entity_id}.{version}-{make_etag(*parts)[1:-1]}"'
+
+
+_VERSIONED_ETAG = re.compile(r'"(\d+)\.(\d+)-[0-9a-f]+"')
+
+
+def etag_version(if_match: str, entity_id: int) -> Optional[int]:
+    """
+    The version of row `entity_id` named by the first strong `versioned_etag` in an
+    If-Match header (a content-coding suffix is ignored), or None if there is none.
+    """
+    for tag in (tag.strip() for tag in if_match.split(",")):
+        match = _VERSIONED_ETAG.fullmatch(_identity_etag(tag))
+        if match and int(match.group(1)) == entity_id:
+            return int(match.group(2))
+    return None
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """
+    Tag `etag` with a content coding, as a compressed body is a different
+    representation from the identity one: "abc" becomes "abc-gzip".
+    """
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str, weak: bool = True) -> bool:
+    """
+    Check an If-None-Match header against `etag`. As RFC 9110 requires for
+    If-None-Match, the comparison is weak: a W/ prefix is ignored. So is a
+    content-coding suffix added by `encoded_etag`.
+
+    With `weak=False`, for If-Match, weak tags never match.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = (tag.strip() for tag in if_none_match.split(","))
+    if not weak:
+        tags = (tag for tag in tags if not tag.startswith("W/"))
+    return any(_identity_etag(tag.removeprefix("W/")) == etag for tag in tags)
+
+
+def _identity_etag(tag: str) -> str:
+    """Undo `encoded_etag`."""
+    for encoding in ENCODINGS:
+        suffix = f'-{encoding}"'
+        if tag.endswith(suffix):
+            return tag[:-len(suffix)] + '"'
+    return tag
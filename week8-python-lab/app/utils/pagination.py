@@ -0,0 +1,33 @@
+import base64
+import json
+
+
+def encode_cursor(sort: str, *values) -> str:
+    """
+    Encode the sort key of the last row on a page into an opaque, URL-safe cursor.
+
+    `sort` names the ordering the page was read in (e.g. "-year"), so the cursor is
+    only accepted back for that same ordering.
+    """
+    raw = json.dumps({"sort": sort, "key": list(values)}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, size: int) -> list:
+    """
+    Decode a cursor created by `encode_cursor` back into its `size` key values.
+
+    :raises ValueError: If the cursor is malformed, was made for another sort order
+                        or does not hold `size` values.
+    """
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except ValueError as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+    if not isinstance(payload, dict) or payload.get("sort") != sort:
+        raise ValueError(f"Invalid cursor for sort {sort!r}: {cursor!r}")
+    values = payload.get("key")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return values
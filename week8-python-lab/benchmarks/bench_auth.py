@@ -0,0 +1,96 @@
+"""
+Measure /login and authenticated POST /books/{id}/reviews throughput without AWS.
+
+Run from the project root:
+
+    python -m benchmarks.bench_auth --requests 2000
+
+COGNITO_MODE is forced to "local", so logins go to the in-process user pool and tokens
+are RS256-signed and verified exactly as Cognito's would be. "same token" posts every
+review with one access token (verified claims are cached); "fresh tokens" logs in
+before each post, so every request pays for a full signature verification. Only the
+auth and reviews routers are mounted, on a temporary SQLite database.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+os.environ["COGNITO_MODE"] = "local"
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.db.db import Base
+from app.models.book import BookCreate
+from app.routes import auth, reviews
+from app.services.book_service import BookService
+from app.services.review_service import AsyncReviewService
+
+USERNAME, PASSWORD = "admin", "goodpassword"
+
+
+def seed(path: str):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as db:
+        BookService(db).add_books([BookCreate(title="Book", author="Author", year=2024, description="A seeded book.")])
+    engine.dispose()
+
+
+def login(client: TestClient) -> str:
+    response = client.post("/login", params={"username": USERNAME, "password": PASSWORD})
+    response.raise_for_status()
+    return response.json()["tokens"]["access_token"]
+
+
+def rate(label: str, count: int, seconds: float):
+    print(f"{label:>22}: {count / seconds:8.0f}/s  ({seconds / count * 1e6:7.0f} us each)")
+
+
+def main(args):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    seed(path)
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=AsyncAdaptedQueuePool)
+    sessions = async_sessionmaker(autoflush=False, expire_on_commit=False, bind=engine)
+
+    async def get_review_service():
+        async with sessions() as db:
+            yield AsyncReviewService(db)
+
+    app = FastAPI()
+    app.include_router(auth.router)
+    app.include_router(reviews.router)
+    app.dependency_overrides[reviews.get_review_service] = get_review_service
+
+    def post_review(client: TestClient, token: str):
+        response = client.post("/books/1/reviews", json={"review": "Benchmarked"},
+                               headers={"Authorization": f"Bearer {token}"})
+        response.raise_for_status()
+
+    with TestClient(app) as client:
+        post_review(client, login(client))  # warm up: JWKS, connections
+
+        start = time.perf_counter()
+        tokens = [login(client) for _ in range(args.requests)]
+        rate("login", args.requests, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for _ in range(args.requests):
+            post_review(client, tokens[0])
+        rate("review, same token", args.requests, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for token in tokens:
+            post_review(client, token)
+        rate("review, fresh tokens", args.requests, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    main(parser.parse_args())
@@ -0,0 +1,91 @@
+"""
+Measure the per-request overhead of the require_roles auth dependency.
+
+Run from the project root:
+
+    python -m benchmarks.bench_auth_dependency --requests 5000
+
+COGNITO_MODE is forced to "local", so tokens are RS256-signed by the in-process pool and
+no AWS call is made. Each variant is a route on a tiny app with an empty handler:
+
+    open          no auth, the baseline
+    previous      the old hand-written check: decode_token (no signature check) + check_user_role
+    cached        require_roles with the claims cache, one token for every request
+    uncached      require_roles with the claims cache disabled, a full RS256 verification per request
+
+The "verify_token" lines time the service call alone, without HTTP.
+"""
+import argparse
+import os
+import statistics
+import time
+
+os.environ["COGNITO_MODE"] = "local"
+
+from fastapi import Depends, FastAPI, Security
+from fastapi.testclient import TestClient
+
+from app.services import cognito_service
+from app.services.cognito_service import bearer_scheme, get_cognito_service, require_roles
+from app.utils.ttl_cache import TTLCache
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    service = get_cognito_service()
+
+    @app.get("/open")
+    async def open_route():
+        return {}
+
+    @app.get("/previous")
+    async def previous_route(token=Security(bearer_scheme)):
+        claims = service.decode_token(token.credentials)
+        service.check_user_role(claims, "Users")
+        return {}
+
+    @app.get("/auth", dependencies=[Depends(require_roles("Users"))])
+    async def auth_route():
+        return {}
+
+    return app
+
+
+def median_us(function, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1e6
+
+
+def main(args):
+    service = get_cognito_service()
+    token = service.local.mint_token("reader", ["Users"])
+    headers = {"Authorization": f"Bearer {token}"}
+    cache = cognito_service.claims_cache
+
+    with TestClient(build_app()) as client:
+        client.get("/auth", headers=headers)  # warm up: JWKS, claims cache
+        results = {}
+        for label, path in (("open", "/open"), ("previous", "/previous"), ("cached", "/auth")):
+            results[label] = median_us(lambda: client.get(path, headers=headers), args.requests)
+        cognito_service.claims_cache = TTLCache(maxsize=0, ttl=0)
+        results["uncached"] = median_us(lambda: client.get("/auth", headers=headers), args.requests)
+        cognito_service.claims_cache = cache
+
+    print(f"Median per request over {args.requests} requests")
+    for label, median in results.items():
+        print(f"{label:>10}: {median:8.1f} us  (+{median - results['open']:7.1f} us over open)")
+
+    print(f"verify_token, cached  : {median_us(lambda: service.verify_token(token), args.requests):8.1f} us")
+    cognito_service.claims_cache = TTLCache(maxsize=0, ttl=0)
+    print(f"verify_token, uncached: {median_us(lambda: service.verify_token(token), args.requests):8.1f} us")
+    cognito_service.claims_cache = cache
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    main(parser.parse_args())
@@ -0,0 +1,106 @@
+"""
+Compare the sync (threadpool) and async (event loop) database paths under concurrent load.
+
+Run from the project root:
+
+    python -m benchmarks.bench_db_paths --requests 2000 --concurrency 200
+
+Both paths read from a temporary SQLite database seeded with `--rows` books, so app.db is not touched.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.db.db import Base
+from app.models.book import BookCreate
+from app.models.review import Review  # noqa: F401  (registers the Book.reviews mapper)
+from app.services.book_service import BookService, AsyncBookService
+
+
+def seed(path: str, rows: int):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as db:
+        BookService(db).add_books([
+            BookCreate(title=f"Book {i}", author=f"Author {i % 100}", year=1900 + i % 120,
+                       description="A seeded book used by the database path benchmark.")
+            for i in range(rows)
+        ])
+    engine.dispose()
+
+
+async def run(label: str, request, total: int, concurrency: int, rows: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await request(random.randint(1, rows))
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    print(
+        f"{label:>6}: {total / elapsed:8.0f} req/s  "
+        f"p50 {statistics.median(latencies) * 1000:6.2f} ms  "
+        f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:6.2f} ms"
+    )
+
+
+async def main(args):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    seed(path, args.rows)
+
+    sync_engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False},
+                                pool_size=args.pool_size, max_overflow=0)
+    sync_sessions = sessionmaker(autoflush=False, bind=sync_engine)
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=AsyncAdaptedQueuePool,
+                                       pool_size=args.pool_size, max_overflow=0)
+    async_sessions = async_sessionmaker(autoflush=False, expire_on_commit=False, bind=async_engine)
+
+    def sync_handler(book_id: int):
+        with sync_sessions() as db:
+            service = BookService(db)
+            service.get_book(book_id)
+            service.get_books_page(20)
+
+    async def sync_request(book_id: int):
+        # What a sync `def` route does: hold one of Starlette's threadpool workers for the whole call
+        await run_in_threadpool(sync_handler, book_id)
+
+    async def async_request(book_id: int):
+        async with async_sessions() as db:
+            service = AsyncBookService(db)
+            await service.get_book(book_id)
+            await service.get_books_page(20)
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, {args.rows} rows, pool size {args.pool_size}")
+    for _ in range(args.rounds):
+        await run("sync", sync_request, args.requests, args.concurrency, args.rows)
+        await run("async", async_request, args.requests, args.concurrency, args.rows)
+
+    sync_engine.dispose()
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--pool-size", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=2)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,82 @@
+"""
+Compare GET /books/ response times with and without the fast JSON path for list responses.
+
+Run from the project root:
+
+    python -m benchmarks.bench_list_json --rows 10000
+
+"model" is the previous path: Book objects validated through BookResponse by FastAPI and
+encoded with its JSON encoder. "fast" reads plain rows and dumps them with one TypeAdapter.
+Only the books router is mounted, on a temporary SQLite database, so app.db is not touched.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.db.db import Base
+from app.models.book import BookCreate
+from app.models.review import Review  # noqa: F401  (registers the Book.reviews mapper)
+from app.routes import books
+from app.services.book_service import BookService, AsyncBookService
+
+
+def seed(path: str, rows: int):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as db:
+        BookService(db).add_books([
+            BookCreate(title=f"Book {i}", author=f"Author {i % 100}", year=1900 + i % 120,
+                       description="A seeded book used by the list serialization benchmark.")
+            for i in range(rows)
+        ])
+    engine.dispose()
+
+
+def run(label: str, client: TestClient, params: dict, repeat: int):
+    timings = []
+    size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get("/books/", params=params)
+        timings.append(time.perf_counter() - start)
+        size = len(response.content)
+    print(f"{label:>6}: median {statistics.median(timings) * 1000:7.1f} ms  min {min(timings) * 1000:7.1f} ms  ({size} bytes)")
+
+
+def main(args):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    seed(path, args.rows)
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=AsyncAdaptedQueuePool)
+    sessions = async_sessionmaker(autoflush=False, expire_on_commit=False, bind=engine)
+
+    async def get_book_service():
+        async with sessions() as db:
+            yield AsyncBookService(db)
+
+    app = FastAPI()
+    app.include_router(books.router, prefix="/books")
+    app.dependency_overrides[books.get_book_service] = get_book_service
+
+    with TestClient(app) as client:
+        for params in ({"all": "true"}, {"limit": 500}):
+            print(f"GET /books/ {params}, {args.rows} rows in the table")
+            for fast in (False, True):
+                books.BOOK_FAST_JSON = fast
+                client.get("/books/", params=params)  # warm up
+                run("fast" if fast else "model", client, params, args.repeat)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=10)
+    main(parser.parse_args())
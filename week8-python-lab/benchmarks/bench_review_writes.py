@@ -0,0 +1,107 @@
+"""
+Measure review inserts and updates per second, before and after making each write a single statement.
+
+Run from the project root:
+
+    python -m benchmarks.bench_review_writes --writes 5000
+
+"before" is the previous ReviewService code, which loaded the Book to check that it
+exists before its own query and commit; "after" is the current ReviewService. Both run
+on a temporary SQLite database with the application's PRAGMAs, so app.db is not touched.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.db.db import Base, apply_sqlite_pragmas, SQLITE_PRAGMAS
+from app.models.book import Book, BookCreate
+from app.models.review import Review, ReviewCreate
+from app.services.book_service import BookService
+from app.services.review_service import ReviewService
+
+
+class BeforeReviewService(ReviewService):
+    """ReviewService.add_review and update_review as they were before."""
+
+    def add_review(self, book_id: int, review_data: ReviewCreate):
+        book = self.db.query(Book).filter(Book.id == book_id).first()
+        if not book:
+            return None
+        new_review = Review(book_id=book_id, **review_data.model_dump())
+        self.db.add(new_review)
+        self.db.commit()
+        self.db.refresh(new_review)
+        return new_review
+
+    def update_review(self, book_id: int, review_id: int, new_review_data: ReviewCreate):
+        book = self.db.query(Book).filter(Book.id == book_id).first()
+        if not book:
+            return None
+        review = self.db.query(Review).filter(Review.id == review_id, Review.book_id == book_id).first()
+        if not review:
+            return None
+        review.review = new_review_data.review
+        self.db.commit()
+        return review
+
+
+def run(label: str, sessions, service_class, writes: int, books: int, statements: list):
+    with sessions() as db:
+        service = service_class(db)
+        book_ids = [random.randint(1, books) for _ in range(writes)]
+
+        statements.clear()
+        start = time.perf_counter()
+        added = [service.add_review(book_id, ReviewCreate(review=f"Review {i}")) for i, book_id in enumerate(book_ids)]
+        insert_rate = writes / (time.perf_counter() - start)
+        insert_statements = len(statements) / writes
+
+        statements.clear()
+        start = time.perf_counter()
+        for review in added:
+            service.update_review(review.book_id, review.id, ReviewCreate(review="Edited"))
+        update_rate = writes / (time.perf_counter() - start)
+        update_statements = len(statements) / writes
+
+    print(
+        f"{label:>6}: inserts {insert_rate:7.0f}/s ({insert_statements:.1f} statements each)  "
+        f"updates {update_rate:7.0f}/s ({update_statements:.1f} statements each)"
+    )
+
+
+def main(args):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(f"sqlite:///{path}")
+    apply_sqlite_pragmas(engine, SQLITE_PRAGMAS)
+    Base.metadata.create_all(engine)
+    # Like the application's AsyncSessionLocal: rows returned by a write are not reloaded after commit
+    sessions = sessionmaker(autoflush=False, expire_on_commit=False, bind=engine)
+    with sessions() as db:
+        BookService(db).add_books([
+            BookCreate(title=f"Book {i}", author=f"Author {i % 100}", year=1900 + i % 120,
+                       description="A seeded book used by the review write benchmark.")
+            for i in range(args.books)
+        ])
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *rest: statements.append(statement))
+
+    print(f"{args.writes} writes per run, {args.books} books, PRAGMAs {SQLITE_PRAGMAS}")
+    for _ in range(args.rounds):
+        run("before", sessions, BeforeReviewService, args.writes, args.books, statements)
+        run("after", sessions, ReviewService, args.writes, args.books, statements)
+
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writes", type=int, default=5000)
+    parser.add_argument("--books", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=2)
+    main(parser.parse_args())
@@ -6,6 +6,8 @@ from alembic import context
 from app.db.db import Base
 from app.models.book import Book  # Import Book model
 from app.models.review import Review  # Import Review model
+from app.models.table_version import TableVersion  # Import TableVersion model
+from app.models.change import Change  # Import Change model
 
 # Set up Alembic Config
 config = context.config
@@ -14,11 +16,18 @@ fileConfig(config.config_file_name)
 # Set the target metadata to Base.metadata
 target_metadata = Base.metadata
 
+def include_name(name, type_, parent_names):
+    """Keep autogenerate away from the FTS5 index and its shadow tables, which have no model."""
+    if type_ == "table":
+        return not name.startswith("books_fts")
+    return True
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode."""
     context.configure(
         url=config.get_main_option("sqlalchemy.url"),
         target_metadata=target_metadata,
+        include_name=include_name,
         literal_binds=True,
     )
     with context.begin_transaction():
@@ -33,7 +42,7 @@ def run_migrations_online():
     )
 
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        context.configure(connection=connection, target_metadata=target_metadata, include_name=include_name)
 
         with context.begin_transaction():
             context.run_migrations()
@@ -0,0 +1,26 @@
+"""Add a (book_id, id) index for listing a book's reviews
+
+Revision ID: 3d9b7e41a6c2
+Revises: 8f3a61d2c0b7
+Create Date: 2026-10-18 15:21:09.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3d9b7e41a6c2'
+down_revision: Union[str, None] = '8f3a61d2c0b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_reviews_book_id_id', 'reviews', ['book_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_reviews_book_id_id', table_name='reviews')
@@ -0,0 +1,62 @@
+"""Add books_fts full-text index over title, author and description
+
+Revision ID: 5c0e2b7d9a41
+Revises: bba4ec055aaa
+Create Date: 2026-10-18 11:40:05.187324
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c0e2b7d9a41'
+down_revision: Union[str, None] = 'bba4ec055aaa'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # External-content FTS5 table: the text lives in books, books_fts only holds the index
+    op.execute("""
+        CREATE VIRTUAL TABLE books_fts USING fts5(
+            title, author, description,
+            content='books', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+    op.execute("INSERT INTO books_fts(books_fts) VALUES ('rebuild')")
+
+    # Keep the index in sync with books
+    op.execute("""
+        CREATE TRIGGER books_fts_ai AFTER INSERT ON books
+        BEGIN
+            INSERT INTO books_fts(rowid, title, author, description)
+            VALUES (new.id, new.title, new.author, new.description);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER books_fts_ad AFTER DELETE ON books
+        BEGIN
+            INSERT INTO books_fts(books_fts, rowid, title, author, description)
+            VALUES ('delete', old.id, old.title, old.author, old.description);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER books_fts_au AFTER UPDATE OF title, author, description ON books
+        BEGIN
+            INSERT INTO books_fts(books_fts, rowid, title, author, description)
+            VALUES ('delete', old.id, old.title, old.author, old.description);
+            INSERT INTO books_fts(rowid, title, author, description)
+            VALUES (new.id, new.title, new.author, new.description);
+        END
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS books_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS books_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS books_fts_ai")
+    op.execute("DROP TABLE IF EXISTS books_fts")
@@ -0,0 +1,28 @@
+"""Add composite indexes for filtered and sorted book listings
+
+Revision ID: 8f3a61d2c0b7
+Revises: 5c0e2b7d9a41
+Create Date: 2026-10-18 13:02:47.660915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f3a61d2c0b7'
+down_revision: Union[str, None] = '5c0e2b7d9a41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_books_author_year', 'books', ['author', 'year'], unique=False)
+    op.create_index('ix_books_year_id', 'books', ['year', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_books_year_id', table_name='books')
+    op.drop_index('ix_books_author_year', table_name='books')
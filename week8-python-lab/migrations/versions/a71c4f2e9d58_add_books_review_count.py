@@ -0,0 +1,53 @@
+"""Add review_count and last_reviewed_at to books, kept by triggers on reviews
+
+Revision ID: a71c4f2e9d58
+Revises: 3d9b7e41a6c2
+Create Date: 2026-10-18 16:04:52.127730
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a71c4f2e9d58'
+down_revision: Union[str, None] = '3d9b7e41a6c2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('books', sa.Column('review_count', sa.Integer(), server_default=sa.text('0'), nullable=False))
+    op.add_column('books', sa.Column('last_reviewed_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_books_review_count_id', 'books', ['review_count', 'id'], unique=False)
+
+    # Existing reviews have no timestamp, so only their count can be backfilled
+    op.execute("UPDATE books SET review_count = (SELECT COUNT(*) FROM reviews WHERE reviews.book_id = books.id)")
+
+    # Every review insert and delete keeps its book's counters in step, whoever issues it.
+    # A book whose last review is deleted goes back to having never been reviewed.
+    op.execute("""
+        CREATE TRIGGER reviews_count_ai AFTER INSERT ON reviews
+        BEGIN
+            UPDATE books SET review_count = review_count + 1, last_reviewed_at = CURRENT_TIMESTAMP
+            WHERE id = new.book_id;
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER reviews_count_ad AFTER DELETE ON reviews
+        BEGIN
+            UPDATE books SET review_count = review_count - 1,
+                last_reviewed_at = CASE WHEN review_count > 1 THEN last_reviewed_at END
+            WHERE id = old.book_id;
+        END
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS reviews_count_ad")
+    op.execute("DROP TRIGGER IF EXISTS reviews_count_ai")
+    op.drop_index('ix_books_review_count_id', table_name='books')
+    op.drop_column('books', 'last_reviewed_at')
+    op.drop_column('books', 'review_count')
@@ -0,0 +1,47 @@
+"""Add table_versions counters bumped by triggers on books and reviews
+
+Revision ID: bba4ec055aaa
+Revises: 13faae009231
+Create Date: 2026-10-18 09:12:31.402118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'bba4ec055aaa'
+down_revision: Union[str, None] = '13faae009231'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ['books', 'reviews']
+EVENTS = {'ai': 'INSERT', 'au': 'UPDATE', 'ad': 'DELETE'}
+
+
+def upgrade() -> None:
+    table_versions = op.create_table('table_versions',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.bulk_insert(table_versions, [{'name': table, 'version': 0} for table in TABLES])
+
+    # Every write to a table bumps its version, whoever issues it
+    for table in TABLES:
+        for suffix, event in EVENTS.items():
+            op.execute(f"""
+                CREATE TRIGGER {table}_version_{suffix} AFTER {event} ON {table}
+                BEGIN
+                    UPDATE table_versions SET version = version + 1 WHERE name = '{table}';
+                END
+            """)
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        for suffix in EVENTS:
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_version_{suffix}")
+    op.drop_table('table_versions')
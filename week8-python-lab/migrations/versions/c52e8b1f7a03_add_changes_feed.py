@@ -0,0 +1,66 @@
+"""Add the changes feed, appended by triggers on books and reviews
+
+Revision ID: c52e8b1f7a03
+Revises: a71c4f2e9d58
+Create Date: 2026-10-18 17:36:40.552107
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c52e8b1f7a03'
+down_revision: Union[str, None] = 'a71c4f2e9d58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# table -> (entity, book id expression, columns whose update is a change)
+ENTITIES = {
+    'books': ('book', 'id', 'title, author, year, description'),
+    'reviews': ('review', 'book_id', 'review, book_id'),
+}
+EVENTS = {'ai': ('INSERT', 'create', 'new'), 'au': ('UPDATE', 'update', 'new'), 'ad': ('DELETE', 'delete', 'old')}
+
+
+def upgrade() -> None:
+    op.create_table('changes',
+    sa.Column('seq', sa.Integer(), nullable=False),
+    sa.Column('entity', sa.String(), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('book_id', sa.Integer(), nullable=False),
+    sa.Column('op', sa.String(), nullable=False),
+    sa.Column('changed_at', sa.DateTime(), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.PrimaryKeyConstraint('seq'),
+    sqlite_autoincrement=True
+    )
+
+    # The feed starts with every existing row, so reading it from the start replays the whole catalog
+    for table, (entity, book_id, _) in ENTITIES.items():
+        op.execute(f"""
+            INSERT INTO changes (entity, entity_id, book_id, op)
+            SELECT '{entity}', id, {book_id}, 'create' FROM {table} ORDER BY id
+        """)
+
+    # Every write is logged, whoever issues it: ORM, bulk or set-based statements and
+    # ON DELETE CASCADE alike. Books' review_count/last_reviewed_at updates are left
+    # out, as the review changes that cause them are in the feed themselves.
+    for table, (entity, book_id, columns) in ENTITIES.items():
+        for suffix, (event, change, row) in EVENTS.items():
+            of_columns = f" OF {columns}" if event == 'UPDATE' else ""
+            op.execute(f"""
+                CREATE TRIGGER {table}_changes_{suffix} AFTER {event}{of_columns} ON {table}
+                BEGIN
+                    INSERT INTO changes (entity, entity_id, book_id, op)
+                    VALUES ('{entity}', {row}.id, {row}.{book_id}, '{change}');
+                END
+            """)
+
+
+def downgrade() -> None:
+    for table in ENTITIES:
+        for suffix in EVENTS:
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_changes_{suffix}")
+    op.drop_table('changes')
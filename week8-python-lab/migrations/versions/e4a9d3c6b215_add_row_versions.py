@@ -0,0 +1,28 @@
+"""Add version columns to books and reviews for optimistic concurrency
+
+Revision ID: e4a9d3c6b215
+Revises: c52e8b1f7a03
+Create Date: 2026-10-18 18:12:05.804391
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a9d3c6b215'
+down_revision: Union[str, None] = 'c52e8b1f7a03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('books', sa.Column('version', sa.Integer(), server_default=sa.text('1'), nullable=False))
+    op.add_column('reviews', sa.Column('version', sa.Integer(), server_default=sa.text('1'), nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('reviews', 'version')
+    op.drop_column('books', 'version')
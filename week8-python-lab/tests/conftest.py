@@ -0,0 +1,41 @@
+# tests/conftest.py
+
+import os
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.db import apply_sqlite_pragmas, SQLITE_PRAGMAS
+from app.services.book_service import book_cache
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture(autouse=True)
+def empty_book_cache():
+    """Start every test with an empty single-book cache."""
+    book_cache.clear()
+    yield
+    book_cache.clear()
+
+@pytest.fixture
+def migrated_db(tmp_path):
+    """
+    A Session on a throwaway SQLite file upgraded with the real Alembic migrations
+    and configured like the application's engine, for tests that depend on indexes,
+    triggers, foreign keys or the FTS5 table.
+    """
+    url = f"sqlite:///{tmp_path / 'test.db'}"
+    config = Config(os.path.join(PROJECT_ROOT, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(PROJECT_ROOT, "migrations"))
+    config.set_main_option("sqlalchemy.url", url)
+    command.upgrade(config, "head")
+
+    engine = create_engine(url)
+    apply_sqlite_pragmas(engine, SQLITE_PRAGMAS)
+    session = sessionmaker(autoflush=False, bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
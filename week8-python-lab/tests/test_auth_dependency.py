@@ -0,0 +1,122 @@
+# tests/test_auth_dependency.py
+
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi import Depends, FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.main import app as main_app
+from app.services import cognito_service
+from app.services.cognito_service import CognitoService, get_claims, get_cognito_service, require_roles
+from app.services.local_cognito import get_local_cognito
+from app.utils.bounded_executor import ExecutorFull
+from app.utils.ttl_cache import TTLCache
+from tests.test_cognito_service import longest_stall
+
+@pytest.fixture
+def pool(monkeypatch):
+    """A local Cognito pool behind get_cognito_service, with an empty claims cache."""
+    monkeypatch.setenv("COGNITO_MODE", "local")
+    monkeypatch.setattr(cognito_service, "claims_cache", TTLCache(maxsize=10, ttl=300))
+    get_local_cognito.cache_clear()
+    get_cognito_service.cache_clear()
+    yield get_cognito_service().local
+    get_local_cognito.cache_clear()
+    get_cognito_service.cache_clear()
+
+@pytest.fixture
+def verify_calls(monkeypatch):
+    calls = []
+    verify = CognitoService._verify_and_cache
+
+    def spy(self, token, cache_key):
+        calls.append(token)
+        return verify(self, token, cache_key)
+
+    monkeypatch.setattr(CognitoService, "_verify_and_cache", spy)
+    return calls
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+
+    @app.post("/reviews", dependencies=[Depends(require_roles("Users", "Admins"))])
+    async def write_review(request: Request, claims: dict = Depends(require_roles("Users"))):
+        return {"username": claims["username"], "state": request.state.claims["username"]}
+
+    @app.delete("/books", dependencies=[Depends(require_roles("Admins"))])
+    async def delete_books():
+        return {"deleted": True}
+
+    return TestClient(app)
+
+def bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+def test_token_is_verified_once_per_request(client, pool, verify_calls):
+    token = pool.mint_token("reader", ["Users"])
+
+    response = client.post("/reviews", headers=bearer(token))
+
+    assert response.status_code == 200
+    assert response.json() == {"username": "reader", "state": "reader"}
+    # Two role checks and the handler share one verification
+    assert verify_calls == [token]
+
+def test_missing_role_is_forbidden(client, pool):
+    response = client.delete("/books", headers=bearer(pool.mint_token("reader", ["Users"])))
+
+    assert response.status_code == 403
+    assert response.json()["detail"] == "Insufficient permissions"
+
+def test_invalid_or_missing_token_is_rejected(client, pool):
+    assert client.delete("/books", headers=bearer(pool.mint_token("admin", ["Admins"], expires_in=-10))).status_code == 401
+    assert client.delete("/books").status_code == 403
+
+def test_book_and_review_writes_require_a_token():
+    client = TestClient(main_app)
+
+    assert client.delete("/books/1").status_code == 403
+    assert client.put("/books/1/reviews/1", json={"review": "Edited"}).status_code == 403
+    assert client.post("/chroma/", params={"book_id": "1", "title": "T", "description": "D"}).status_code == 403
+    assert client.delete("/chroma/1").status_code == 403
+
+def test_cache_miss_does_not_block_the_event_loop(client, pool, monkeypatch):
+    verify = CognitoService._verify_and_cache
+
+    def slow_verify(self, token, cache_key):
+        time.sleep(0.5)
+        return verify(self, token, cache_key)
+
+    monkeypatch.setattr(CognitoService, "_verify_and_cache", slow_verify)
+    token = pool.mint_token("reader", ["Users"])
+
+    async def post_review():
+        transport = httpx.ASGITransport(app=client.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await http.post("/reviews", headers=bearer(token))
+
+    response, stall = asyncio.run(longest_stall(post_review()))
+
+    assert response.status_code == 200
+    assert stall < 0.25
+
+def test_cache_miss_sheds_load_with_503_when_the_executor_is_full(client, pool, monkeypatch):
+    async def full(function, *args):
+        raise ExecutorFull("full")
+
+    monkeypatch.setattr(cognito_service.cognito_executor, "run", full)
+
+    response = client.post("/reviews", headers=bearer(pool.mint_token("reader", ["Users"])))
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+def test_claims_can_be_overridden_in_tests(client):
+    client.app.dependency_overrides[get_claims] = lambda: {"username": "tester", "cognito:groups": ["Admins"]}
+
+    assert client.delete("/books").json() == {"deleted": True}
+    assert client.post("/reviews").status_code == 403
@@ -0,0 +1,205 @@
+# tests/test_book_queries.py
+#
+# BookService queries run against a real, migrated SQLite database.
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.dialects import sqlite
+
+from app.models.book import BookCreate, BookFilters
+from app.models.review import Review
+from app.services.book_service import BookService, VersionConflict
+
+@pytest.fixture
+def service(migrated_db):
+    service = BookService(migrated_db)
+    service.add_books([
+        BookCreate(title="Dune", author="Frank Herbert", year=1965,
+                   description="Desert planet politics, ecology and the spice melange."),
+        BookCreate(title="The Desert Spear", author="Peter V. Brett", year=2010,
+                   description="A demon-haunted world where the night belongs to monsters."),
+        BookCreate(title="Café Stories", author="Ana Désert", year=2001,
+                   description="Short stories set in a small café by the sea."),
+    ])
+    return service
+
+def test_search_ranks_title_matches_first(service):
+    results = service.search_books("desert")
+
+    assert [row.title for row in results] == ["The Desert Spear", "Café Stories", "Dune"]
+    assert "<mark>Desert</mark>" in results[0].snippet
+
+def test_search_requires_every_term_and_ignores_accents(service):
+    assert [row.title for row in service.search_books("spice desert")] == ["Dune"]
+    assert [row.title for row in service.search_books("cafe")] == ["Café Stories"]
+
+def test_search_treats_query_syntax_as_plain_words(service):
+    # FTS5 operators and quotes in user input must not raise or change the query
+    assert service.search_books('dune" OR NOT (') == []
+    assert service.search_books("*** ---") == []
+
+def test_search_snippet_escapes_stored_html(service):
+    service.add_book(BookCreate(title="Injected", author="Mallory", year=2020,
+                                description='A dragon tale <script>alert("x")</script> & <b>more</b>.'))
+
+    snippet = service.search_books("dragon")[0].snippet
+
+    assert "<script>" not in snippet and "<b>" not in snippet
+    assert "&lt;script&gt;" in snippet and "&amp;" in snippet
+    assert "<mark>dragon</mark>" in snippet
+
+def test_search_index_follows_updates_and_deletes(service, migrated_db):
+    dune = service.search_books("dune")[0]
+    service.update_book(dune.id, BookCreate(title="Children of Dune", author="Frank Herbert", year=1976,
+                                            description="The sequel, after the desert war."))
+    assert [row.title for row in service.search_books("children")] == ["Children of Dune"]
+    assert service.search_books("spice") == []
+
+    service.delete_book(dune.id)
+    assert service.search_books("children") == []
+
+def query_plan(session, query) -> str:
+    """EXPLAIN QUERY PLAN output of an ORM query, one step per line."""
+    sql = query.statement.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True})
+    return "\n".join(row[-1] for row in session.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+
+@pytest.fixture
+def catalog(migrated_db):
+    service = BookService(migrated_db)
+    service.add_books([
+        BookCreate(title=f"Book {i:02}", author=f"Author {i % 3}", year=2000 + i % 5,
+                   description="A book in the filtered listing tests.")
+        for i in range(30)
+    ])
+    return service
+
+@pytest.mark.parametrize("sort", ["id", "-id", "year", "-year", "review_count", "-review_count"])
+def test_keyset_pages_cover_every_book_once_in_order(catalog, sort):
+    filters = BookFilters(year_from=2001, year_to=2003)
+    expected = catalog.get_books(filters=filters, sort=sort)
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = catalog.get_books_page(4, cursor, filters=filters, sort=sort)
+        seen.extend(page)
+        if cursor is None:
+            break
+
+    assert [book.id for book in seen] == [book.id for book in expected]
+    assert all(2001 <= book.year <= 2003 for book in seen)
+    key = (lambda b: (b.year, b.id)) if "year" in sort else (lambda b: b.id)
+    assert [key(b) for b in seen] == sorted(map(key, seen), reverse=sort.startswith("-"))
+
+def test_keyset_page_with_fields_includes_sort_key(catalog):
+    page, cursor = catalog.get_books_page(2, fields=["title"], sort="year")
+    assert page[0]._fields == ("year", "id", "title")
+    next_page, _ = catalog.get_books_page(2, cursor, fields=["title"], sort="year")
+    assert (next_page[0].year, next_page[0].id) > (page[-1].year, page[-1].id)
+
+def test_cursor_from_another_sort_order_is_rejected(catalog):
+    cursor = catalog.get_books_page(2, sort="year")[1]
+
+    for sort in ("-year", "review_count", "id"):
+        with pytest.raises(ValueError):
+            catalog.get_books_page(2, cursor, sort=sort)
+
+def test_author_filter_sorted_by_year_uses_author_year_index(catalog, migrated_db):
+    cursor = catalog.get_books_page(2, filters=BookFilters(author="Author 1"), sort="year")[1]
+    query = catalog._page_query(2, cursor, filters=BookFilters(author="Author 1"), sort="year")
+
+    plan = query_plan(migrated_db, query)
+    assert "USING INDEX ix_books_author_year (author=? AND year>?)" in plan
+    assert "TEMP B-TREE" not in plan
+
+@pytest.mark.parametrize("sort", ["year", "-year"])
+def test_year_range_sorted_by_year_uses_year_id_index(catalog, migrated_db, sort):
+    query = catalog._page_query(10, filters=BookFilters(year_from=2001, year_to=2003), sort=sort)
+
+    plan = query_plan(migrated_db, query)
+    assert "USING INDEX ix_books_year_id (year>? AND year<?)" in plan
+    assert "TEMP B-TREE" not in plan
+
+def test_most_reviewed_listing_uses_review_count_index(catalog, migrated_db):
+    migrated_db.add_all([Review(book_id=book_id, review="Seen") for book_id in (3, 3, 3, 7, 7, 9)])
+    migrated_db.commit()
+
+    page, cursor = catalog.get_books_page(2, sort="-review_count")
+    assert [(book.id, book.review_count) for book in page] == [(3, 3), (7, 2)]
+
+    plan = query_plan(migrated_db, catalog._page_query(2, cursor, sort="-review_count"))
+    assert "USING INDEX ix_books_review_count_id" in plan
+    assert "TEMP B-TREE" not in plan
+
+def test_attach_reviews_caps_each_book_in_one_indexed_query(catalog, migrated_db):
+    migrated_db.add_all([Review(book_id=book_id, review=f"Review {i}")
+                         for i, book_id in enumerate([2, 1, 2, 1, 2, 2, 4])])
+    migrated_db.commit()
+    books = catalog.get_books_page(4)[0]
+
+    statements = []
+    def record(conn, cursor, statement, parameters, *args):
+        statements.append((statement, parameters))
+    event.listen(migrated_db.bind, "before_cursor_execute", record)
+    try:
+        catalog.attach_reviews(books, 3)
+        counts = {book.id: [review.review for review in book.reviews] for book in books}
+    finally:
+        event.remove(migrated_db.bind, "before_cursor_execute", record)
+
+    assert counts == {1: ["Review 1", "Review 3"], 2: ["Review 0", "Review 2", "Review 4"], 3: [], 4: ["Review 6"]}
+    assert len(statements) == 1
+    statement, parameters = statements[0]
+    plan = "\n".join(row[-1] for row in migrated_db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters))
+    assert "ix_reviews_book_id_id" in plan
+
+def test_default_listing_reads_the_primary_key(catalog, migrated_db):
+    cursor = catalog.get_books_page(2)[1]
+
+    plan = query_plan(migrated_db, catalog._page_query(2, cursor))
+    assert "USING INTEGER PRIMARY KEY (rowid>?)" in plan
+    assert "TEMP B-TREE" not in plan
+
+def test_batch_lookup_keeps_the_requested_order_and_reports_missing_ids(catalog, migrated_db):
+    statements = []
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+    event.listen(migrated_db.bind, "before_cursor_execute", record)
+    try:
+        books, missing = catalog.get_books_by_ids([5, 999, 2, 5, 7])
+    finally:
+        event.remove(migrated_db.bind, "before_cursor_execute", record)
+
+    assert [book.id for book in books] == [5, 2, 7]
+    assert missing == [999]
+    assert len(statements) == 1 and " IN (" in statements[0]
+
+def test_update_returns_the_new_row_and_keeps_404_semantics(catalog):
+    updated = catalog.update_book(1, BookCreate(title="Retitled", author="Author 1", year=1999,
+                                                description="Updated in a single statement."))
+    assert (updated.id, updated.title, updated.year) == (1, "Retitled", 1999)
+    assert catalog.get_book(1).title == "Retitled"
+    assert catalog.update_book(999, BookCreate(title="Missing", author="Nobody", year=2000,
+                                               description="There is no such book.")) is None
+
+def test_update_with_version_is_a_compare_and_swap(catalog):
+    first = BookCreate(title="First writer", author="Author 1", year=2001, description="Read version 1 and won.")
+    second = BookCreate(title="Second writer", author="Author 1", year=2002, description="Read version 1 and lost.")
+
+    assert catalog.update_book(1, first, version=1).version == 2
+    with pytest.raises(VersionConflict) as conflict:
+        catalog.update_book(1, second, version=1)
+    assert conflict.value.current_version == 2
+    assert catalog.get_book(1).title == "First writer"
+    # An unconditional update still bumps the version, and a missing book is still None
+    assert catalog.update_book(1, second).version == 3
+    assert catalog.update_book(999, second, version=1) is None
+
+def test_delete_cascades_to_reviews_through_the_foreign_key(catalog, migrated_db):
+    migrated_db.add_all([Review(book_id=1, review="First"), Review(book_id=1, review="Second"),
+                         Review(book_id=2, review="Other book")])
+    migrated_db.commit()
+    migrated_db.expunge_all()
+
+    assert catalog.delete_book(1) is True
+    assert catalog.delete_book(1) is False
+    assert [r.book_id for r in migrated_db.query(Review).all()] == [2]
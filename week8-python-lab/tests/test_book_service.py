@@ -1,11 +1,14 @@
 # tests/test_book_service.py
 
+import asyncio
 import pytest
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.services.book_service import BookService
-from app.models.book import Book, BookCreate
+from app.services.book_service import BookService, AsyncBookService, book_cache
+from app.models.book import Book, BookCreate, BookResponse
+from app.utils.pagination import encode_cursor, decode_cursor
 
 @pytest.fixture
 def mock_db_session():
@@ -36,6 +39,86 @@ def test_get_books_returns_list(mock_db_session):
     mock_db_session.query.assert_called_once_with(Book)
     mock_db_session.query.return_value.all.assert_called_once()
 
+def test_get_books_page_first_page(mock_db_session):
+    # 1) Arrange
+    # One row more than the limit comes back, so there is a next page
+    query = mock_db_session.query.return_value
+    query.order_by.return_value.limit.return_value.all.return_value = [
+        Book(id=1, title="Title1", author="Author1", year=2021, description="Desc1"),
+        Book(id=2, title="Title2", author="Author2", year=2022, description="Desc2"),
+        Book(id=3, title="Title3", author="Author3", year=2023, description="Desc3"),
+    ]
+
+    service = BookService(mock_db_session)
+
+    # 2) Act
+    books, next_cursor = service.get_books_page(2)
+
+    # 3) Assert
+    assert [book.id for book in books] == [1, 2]
+    assert decode_cursor(next_cursor, "id", 1) == [2]
+    query.filter.assert_not_called()
+    query.order_by.return_value.limit.assert_called_once_with(3)
+
+def test_get_books_page_last_page(mock_db_session):
+    # 1) Arrange
+    query = mock_db_session.query.return_value
+    query.filter.return_value.order_by.return_value.limit.return_value.all.return_value = [
+        Book(id=3, title="Title3", author="Author3", year=2023, description="Desc3"),
+    ]
+
+    service = BookService(mock_db_session)
+
+    # 2) Act
+    books, next_cursor = service.get_books_page(2, after=encode_cursor("id", 2))
+
+    # 3) Assert
+    assert [book.id for book in books] == [3]
+    assert next_cursor is None
+    query.filter.assert_called_once()
+
+def test_get_books_page_invalid_cursor(mock_db_session):
+    service = BookService(mock_db_session)
+
+    with pytest.raises(ValueError):
+        service.get_books_page(2, after="not-a-cursor")
+    with pytest.raises(ValueError):
+        service.get_books_page(2, after=encode_cursor("id", "2"))
+    # A cursor is only valid for the sort order it was made for
+    with pytest.raises(ValueError):
+        service.get_books_page(2, after=encode_cursor("-id", 2))
+
+def test_get_books_page_with_fields_selects_only_those_columns(mock_db_session):
+    # 1) Arrange
+    query = mock_db_session.query.return_value
+    query.order_by.return_value.limit.return_value.all.return_value = []
+
+    service = BookService(mock_db_session)
+
+    # 2) Act
+    service.get_books_page(10, fields=["title", "author"])
+
+    # 3) Assert
+    # id is always selected (the cursor needs it) and description is never loaded
+    selected = mock_db_session.query.call_args.args
+    assert [column.key for column in selected] == ["id", "title", "author"]
+
+def test_iter_books_uses_yield_per(mock_db_session):
+    # 1) Arrange
+    query = mock_db_session.query.return_value
+    query.order_by.return_value.yield_per.return_value = iter([
+        Book(id=1, title="Title1", author="Author1", year=2021, description="Desc1"),
+    ])
+
+    service = BookService(mock_db_session)
+
+    # 2) Act
+    books = list(service.iter_books(chunk_size=500))
+
+    # 3) Assert
+    assert [book.id for book in books] == [1]
+    query.order_by.return_value.yield_per.assert_called_once_with(500)
+
 def test_get_book_found(mock_db_session):
     # 1) Arrange
     mock_book = Book(id=10, title="Some Book", author="Some Author", year=2020, description="Desc")
@@ -66,6 +149,50 @@ def test_get_book_not_found(mock_db_session):
     assert result is None
     mock_db_session.query.return_value.filter.assert_called_once()
 
+def test_get_cached_book_reads_through_the_cache(mock_db_session):
+    # 1) Arrange
+    mock_book = Book(id=10, title="Some Book", author="Some Author", year=2020, description="A description", review_count=0, version=1)
+    mock_db_session.query.return_value.filter.return_value.first.return_value = mock_book
+
+    service = BookService(mock_db_session)
+
+    # 2) Act
+    first = service.get_cached_book(10)
+    second = service.get_cached_book(10)
+
+    # 3) Assert
+    # Only the first call reaches the database
+    assert first == BookResponse(id=10, title="Some Book", author="Some Author", year=2020, description="A description")
+    assert second is first
+    mock_db_session.query.return_value.filter.return_value.first.assert_called_once()
+    assert book_cache.stats()["hits"] == 1
+
+def test_get_cached_book_not_found_is_not_cached(mock_db_session):
+    mock_db_session.query.return_value.filter.return_value.first.return_value = None
+
+    service = BookService(mock_db_session)
+
+    assert service.get_cached_book(999) is None
+    assert book_cache.stats()["size"] == 0
+
+def test_update_and_delete_invalidate_the_cache(mock_db_session):
+    # 1) Arrange
+    existing_book = Book(id=10, title="Old Title", author="Old Author", year=2000, description="Old Description", review_count=0, version=1)
+    mock_db_session.query.return_value.filter.return_value.first.return_value = existing_book
+    service = BookService(mock_db_session)
+    service.get_cached_book(10)
+
+    # 2) Act / 3) Assert
+    updated_data = BookCreate(title="New Title", author="New Author", year=2023, description="New Description")
+    mock_db_session.scalars.return_value.first.return_value = Book(id=10, **updated_data.model_dump())
+    service.update_book(10, updated_data)
+    assert book_cache.stats()["size"] == 0
+
+    service.get_cached_book(10)
+    mock_db_session.execute.return_value.rowcount = 1
+    service.delete_book(10)
+    assert book_cache.stats()["size"] == 0
+
 def test_add_book(mock_db_session):
     # 1) Arrange
     # A new BookCreate payload
@@ -105,23 +232,39 @@ def test_add_book(mock_db_session):
     mock_db_session.commit.assert_called_once()
     mock_db_session.refresh.assert_called_once_with(result)
 
-def test_update_book_found(mock_db_session):
+def test_add_books_batches_inserts_in_one_transaction(mock_db_session):
     # 1) Arrange
-    existing_book = Book(
-        id=10,
-        title="Old Title",
-        author="Old Author",
-        year=2000,
-        description="Old Description",
-    )
-    mock_db_session.query.return_value.filter.return_value.first.return_value = existing_book
+    books = [
+        BookCreate(title=f"Book {i}", author="Bulk Author", year=2020 + i, description="Bulk description")
+        for i in range(3)
+    ]
+    # Each batched INSERT ... RETURNING hands back the ids of its rows
+    mock_db_session.scalars.return_value.all.side_effect = [[1, 2], [3]]
+
+    service = BookService(mock_db_session)
+
+    # 2) Act
+    ids = service.add_books(books, chunk_size=2)
 
+    # 3) Assert
+    assert ids == [1, 2, 3]
+    assert mock_db_session.scalars.call_count == 2
+    first_batch = mock_db_session.scalars.call_args_list[0].args[1]
+    assert [row["title"] for row in first_batch] == ["Book 0", "Book 1"]
+    mock_db_session.commit.assert_called_once()
+    mock_db_session.add.assert_not_called()
+
+def test_update_book_found(mock_db_session):
+    # 1) Arrange
     updated_data = BookCreate(
         title="New Title",
         author="New Author",
         year=2023,
         description="New Description"  # 15 characters here
     )
+    # UPDATE ... RETURNING hands back the updated row
+    updated_row = Book(id=10, **updated_data.model_dump())
+    mock_db_session.scalars.return_value.first.return_value = updated_row
 
     service = BookService(mock_db_session)
 
@@ -129,17 +272,20 @@ def test_update_book_found(mock_db_session):
     updated_book = service.update_book(10, updated_data)
 
     # 3) Assert
-    assert updated_book is existing_book
+    assert updated_book is updated_row
     assert updated_book.title == "New Title"
-    assert updated_book.year == 2023
-    assert updated_book.description == "New Description"
-    mock_db_session.query.return_value.filter.assert_called_once()
+    # One UPDATE statement: no SELECT before it and no refresh after it
+    statement = mock_db_session.scalars.call_args.args[0]
+    assert statement.is_update
+    assert "RETURNING" in str(statement)
+    mock_db_session.query.assert_not_called()
     mock_db_session.commit.assert_called_once()
-    mock_db_session.refresh.assert_called_once_with(existing_book)
+    mock_db_session.refresh.assert_not_called()
 
 def test_update_book_not_found(mock_db_session):
     # 1) Arrange
-    mock_db_session.query.return_value.filter.return_value.first.return_value = None
+    # UPDATE ... RETURNING matched no row
+    mock_db_session.scalars.return_value.first.return_value = None
 
     service = BookService(mock_db_session)
 
@@ -160,8 +306,7 @@ def test_update_book_not_found(mock_db_session):
 
 def test_delete_book_found(mock_db_session):
     # 1) Arrange
-    existing_book = Book(id=10, title="Delete Me", author="Author", year=2000, description="Desc")
-    mock_db_session.query.return_value.filter.return_value.first.return_value = existing_book
+    mock_db_session.execute.return_value.rowcount = 1
 
     service = BookService(mock_db_session)
 
@@ -169,14 +314,17 @@ def test_delete_book_found(mock_db_session):
     result = service.delete_book(10)
 
     # 3) Assert
+    # One set-based DELETE; the reviews go through ON DELETE CASCADE, never loaded
     assert result is True
-    mock_db_session.delete.assert_called_once_with(existing_book)
+    assert mock_db_session.execute.call_args.args[0].is_delete
+    mock_db_session.query.assert_not_called()
+    mock_db_session.delete.assert_not_called()
     mock_db_session.commit.assert_called_once()
 
 def test_delete_book_not_found(mock_db_session):
     # 1) Arrange
     # No book found
-    mock_db_session.query.return_value.filter.return_value.first.return_value = None
+    mock_db_session.execute.return_value.rowcount = 0
 
     service = BookService(mock_db_session)
 
@@ -185,5 +333,22 @@ def test_delete_book_not_found(mock_db_session):
 
     # 3) Assert
     assert result is False
-    mock_db_session.delete.assert_not_called()
     mock_db_session.commit.assert_not_called()
+
+def test_async_book_service_runs_book_service_on_the_sync_session(mock_db_session):
+    # 1) Arrange
+    # run_sync hands the callable the AsyncSession's underlying sync Session
+    mock_async_session = MagicMock(spec=AsyncSession)
+    mock_async_session.run_sync = AsyncMock(side_effect=lambda fn: fn(mock_db_session))
+    mock_book = Book(id=10, title="Some Book", author="Some Author", year=2020, description="Desc")
+    mock_db_session.query.return_value.filter.return_value.first.return_value = mock_book
+
+    service = AsyncBookService(mock_async_session)
+
+    # 2) Act
+    result = asyncio.run(service.get_book(10))
+
+    # 3) Assert
+    assert result == mock_book
+    mock_async_session.run_sync.assert_awaited_once()
+    mock_db_session.query.assert_called_once_with(Book)
@@ -1,11 +1,18 @@
+import json
 import pytest
+from datetime import datetime
+from collections import namedtuple
 from unittest.mock import MagicMock
 from fastapi.testclient import TestClient
 
 from app.main import app
-from app.models.book import BookCreate, BookResponse
-from app.services.book_service import BookService
+from app.models.book import Book, BookCreate, BookResponse, BookFilters, BOOK_FIELDS
+from app.models.review import Review
+from app.services.book_service import AsyncBookService, VersionConflict
+from app.utils.etag import encoded_etag
+from app.routes import books as books_routes
 from app.routes.books import get_book_service
+from app.services.cognito_service import get_claims
 
 @pytest.fixture
 def client():
@@ -15,10 +22,11 @@ def client():
 @pytest.fixture
 def mock_book_service():
     """
-    Create a mock for BookService that we can configure in each test.
-    The `spec=BookService` argument ensures our mock has the same attributes.
+    Create a mock for AsyncBookService that we can configure in each test.
+    The `spec=AsyncBookService` argument ensures our mock has the same attributes,
+    and its async methods are mocked with AsyncMock so the routes can await them.
     """
-    return MagicMock(spec=BookService)
+    return MagicMock(spec=AsyncBookService)
 
 @pytest.fixture
 def override_book_service(mock_book_service):
@@ -27,31 +35,27 @@ def override_book_service(mock_book_service):
     After the test ends, clear overrides.
     """
     app.dependency_overrides[get_book_service] = lambda: mock_book_service
+    # Writes require an admin token; their auth is tested in test_auth_dependency.py
+    app.dependency_overrides[get_claims] = lambda: {"cognito:groups": ["Admins"]}
     yield
     app.dependency_overrides = {}
 
+BookRow = namedtuple("BookRow", BOOK_FIELDS)
+
+def book_row(**values):
+    """A full books row, as the list routes read it for the fast JSON path."""
+    return BookRow(**{"review_count": 0, "last_reviewed_at": None, "version": 1, **values})
+
 def test_get_books(client, mock_book_service, override_book_service):
-    """Test GET /books/ returns list of books."""
+    """Test GET /books/?all=true returns the unpaginated list of books."""
     # 1) Configure the mock's return value
     mock_book_service.get_books.return_value = [
-        BookResponse(
-            id=1, 
-            title="Book One", 
-            author="Author One", 
-            year=2021,
-            description="First book"
-        ),
-        BookResponse(
-            id=2, 
-            title="Book Two", 
-            author="Author Two", 
-            year=2022,
-            description="Second book"
-        ),
+        book_row(id=1, title="Book One", author="Author One", year=2021, description="First book"),
+        book_row(id=2, title="Book Two", author="Author Two", year=2022, description="Second book"),
     ]
 
     # 2) Make the request
-    response = client.get("/books/")
+    response = client.get("/books/", params={"all": "true"})
 
     # 3) Check the response
     assert response.status_code == 200
@@ -61,21 +65,237 @@ def test_get_books(client, mock_book_service, override_book_service):
             "title": "Book One",
             "author": "Author One",
             "year": 2021,
-            "description": "First book"
+            "description": "First book",
+            "review_count": 0,
+            "last_reviewed_at": None,
+            "version": 1
         },
         {
             "id": 2,
             "title": "Book Two",
             "author": "Author Two",
             "year": 2022,
-            "description": "Second book"
+            "description": "Second book",
+            "review_count": 0,
+            "last_reviewed_at": None,
+            "version": 1
         },
     ]
-    mock_book_service.get_books.assert_called_once()
+    mock_book_service.get_books.assert_called_once_with(list(BOOK_FIELDS), BookFilters(), None)
+
+def test_get_books_without_fast_json(client, mock_book_service, override_book_service, monkeypatch):
+    """Test GET /books/ validates Book objects through BookResponse when BOOK_FAST_JSON is off."""
+    monkeypatch.setattr(books_routes, "BOOK_FAST_JSON", False)
+    mock_book_service.get_books_page.return_value = (
+        [BookResponse(id=3, title="Book Three", author="Author Three", year=2023, description="Third book")],
+        None,
+    )
+
+    response = client.get("/books/")
+    assert response.status_code == 200
+    assert response.json()["items"][0]["title"] == "Book Three"
+    mock_book_service.get_books_page.assert_called_once_with(50, None, None, BookFilters(), "id")
+
+def test_get_books_page(client, mock_book_service, override_book_service):
+    """Test GET /books/ returns a page of books with the cursor for the next one."""
+    mock_book_service.get_books_page.return_value = (
+        [book_row(id=3, title="Book Three", author="Author Three", year=2023, description="Third book")],
+        "WzNd",
+    )
+
+    response = client.get("/books/", params={"limit": 1, "after": "WzJd"})
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "items": [
+            {
+                "id": 3,
+                "title": "Book Three",
+                "author": "Author Three",
+                "year": 2023,
+                "description": "Third book",
+                "review_count": 0,
+                "last_reviewed_at": None,
+                "version": 1
+            }
+        ],
+        "next_cursor": "WzNd",
+    }
+    mock_book_service.get_books_page.assert_called_once_with(1, "WzJd", list(BOOK_FIELDS), BookFilters(), "id")
+    mock_book_service.get_books.assert_not_called()
+
+def test_get_books_filtered_and_sorted(client, mock_book_service, override_book_service):
+    """Test GET /books/ passes author/year filters and the sort order to the service."""
+    mock_book_service.get_books_page.return_value = ([], None)
+
+    response = client.get("/books/", params={"author": "Jane Austen", "year_from": 1800, "year_to": 1820, "sort": "-year"})
+
+    assert response.status_code == 200
+    mock_book_service.get_books_page.assert_called_once_with(
+        50, None, list(BOOK_FIELDS), BookFilters(author="Jane Austen", year_from=1800, year_to=1820), "-year"
+    )
+
+def test_get_books_unknown_sort(client, mock_book_service, override_book_service):
+    """Test GET /books/ rejects sort orders it has no index for."""
+    response = client.get("/books/", params={"sort": "description"})
+    assert response.status_code == 422
+
+def test_get_books_page_invalid_cursor(client, mock_book_service, override_book_service):
+    """Test GET /books/ returns 400 when the cursor cannot be decoded."""
+    mock_book_service.get_books_page.side_effect = ValueError("Invalid cursor")
+
+    response = client.get("/books/", params={"after": "not-a-cursor"})
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid cursor"}
+
+def test_get_books_sparse_fields(client, mock_book_service, override_book_service):
+    """Test GET /books/?fields= returns only the requested fields."""
+    Row = namedtuple("Row", ["id", "title"])
+    mock_book_service.get_books_page.return_value = ([Row(1, "Book One"), Row(2, "Book Two")], None)
+
+    response = client.get("/books/", params={"fields": "title,id"})
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "items": [{"id": 1, "title": "Book One"}, {"id": 2, "title": "Book Two"}],
+        "next_cursor": None,
+    }
+    mock_book_service.get_books_page.assert_called_once_with(50, None, ["title", "id"], BookFilters(), "id")
+
+def test_get_books_sparse_fields_with_timestamps(client, mock_book_service, override_book_service):
+    """Test GET /books/?fields= encodes datetime columns as ISO 8601 strings."""
+    Row = namedtuple("Row", ["id", "last_reviewed_at"])
+    mock_book_service.get_books_page.return_value = ([Row(1, datetime(2026, 10, 18, 9, 30))], None)
+
+    response = client.get("/books/", params={"fields": "last_reviewed_at"})
+    assert response.status_code == 200
+    assert response.json()["items"] == [{"id": 1, "last_reviewed_at": "2026-10-18T09:30:00"}]
+
+def test_get_books_unknown_field(client, mock_book_service, override_book_service):
+    """Test GET /books/?fields= returns 400 for fields that do not exist."""
+    response = client.get("/books/", params={"fields": "title,isbn"})
+
+    assert response.status_code == 400
+    mock_book_service.get_books_page.assert_not_called()
+
+def test_get_book_sparse_fields(client, mock_book_service, override_book_service):
+    """Test GET /books/{book_id}?fields= reads only the requested columns."""
+    Row = namedtuple("Row", ["id", "author"])
+    mock_book_service.get_book_fields.return_value = Row(10, "Some Author")
+
+    response = client.get("/books/10", params={"fields": "author"})
+
+    assert response.status_code == 200
+    assert response.json() == {"id": 10, "author": "Some Author"}
+    mock_book_service.get_book_fields.assert_called_once_with(10, ["author"])
+    mock_book_service.get_cached_book.assert_not_called()
+
+def test_get_books_batch(client, mock_book_service, override_book_service):
+    """Test GET /books/batch returns the books found in order and the missing ids."""
+    mock_book_service.get_books_by_ids.return_value = (
+        [
+            BookResponse(id=3, title="Book Three", author="Author Three", year=2023, description="Third book"),
+            BookResponse(id=1, title="Book One", author="Author One", year=2021, description="First book"),
+        ],
+        [99],
+    )
+
+    response = client.get("/books/batch", params={"ids": "3,99,1"})
+    assert response.status_code == 200
+    body = response.json()
+    assert [book["id"] for book in body["items"]] == [3, 1]
+    assert body["missing"] == [99]
+    mock_book_service.get_books_by_ids.assert_called_once_with([3, 99, 1], None)
+
+def test_post_books_batch_with_fields(client, mock_book_service, override_book_service):
+    """Test POST /books/batch takes the ids from the body and honours ?fields=."""
+    Row = namedtuple("Row", ["id", "title"])
+    mock_book_service.get_books_by_ids.return_value = ([Row(2, "Book Two")], [])
+
+    response = client.post("/books/batch", params={"fields": "title"}, json={"ids": [2]})
+    assert response.status_code == 200
+    assert response.json() == {"items": [{"id": 2, "title": "Book Two"}], "missing": []}
+    mock_book_service.get_books_by_ids.assert_called_once_with([2], ["title"])
+
+@pytest.mark.parametrize("ids", ["1,two", ",", ",".join(["1"] * 501)])
+def test_get_books_batch_invalid_ids(client, mock_book_service, override_book_service, ids):
+    """Test GET /books/batch rejects non-integer, empty and oversized id lists."""
+    response = client.get("/books/batch", params={"ids": ids})
+    assert response.status_code == 400
+    mock_book_service.get_books_by_ids.assert_not_called()
+
+def test_get_book_include_reviews(client, mock_book_service, override_book_service):
+    """Test GET /books/{id}?include=reviews embeds the reviews loaded by attach_reviews."""
+    book = Book(id=10, title="Some Book", author="Some Author", year=2020, description="A description", review_count=1, version=1)
+    book.reviews = [Review(id=5, book_id=10, review="Loved it", version=1)]
+    mock_book_service.get_book.return_value = book
+
+    response = client.get("/books/10", params={"include": "reviews", "reviews_limit": 3})
+    assert response.status_code == 200
+    assert response.json()["reviews"] == [{"id": 5, "book_id": 10, "review": "Loved it", "version": 1}]
+    mock_book_service.attach_reviews.assert_called_once_with([book], 3)
+    mock_book_service.get_cached_book.assert_not_called()
+
+def test_get_books_include_reviews(client, mock_book_service, override_book_service):
+    """Test GET /books/?include=reviews embeds reviews in the page and versions both tables."""
+    book = Book(id=1, title="Book One", author="Author One", year=2021, description="First book", review_count=0, version=1)
+    book.reviews = []
+    mock_book_service.get_version.return_value = 3
+    mock_book_service.get_books_page.return_value = ([book], None)
+
+    response = client.get("/books/", params={"include": "reviews"})
+    assert response.status_code == 200
+    assert response.json()["items"][0]["reviews"] == []
+    mock_book_service.attach_reviews.assert_called_once_with([book], 10)
+    mock_book_service.get_version.assert_called_once_with("books", "reviews")
+
+def test_include_reviews_rejects_fields(client, mock_book_service, override_book_service):
+    """Test include=reviews cannot be combined with a sparse fieldset."""
+    assert client.get("/books/", params={"include": "reviews", "fields": "title"}).status_code == 400
+    assert client.get("/books/1", params={"include": "reviews", "fields": "title"}).status_code == 400
+
+def test_search_books(client, mock_book_service, override_book_service):
+    """Test GET /books/search returns ranked matches with snippets."""
+    mock_book_service.search_books.return_value = [
+        {"id": 2, "title": "FastAPI Essentials", "author": "John Doe", "year": 2023,
+         "snippet": "mastering <mark>FastAPI</mark>", "rank": -1.5},
+    ]
+
+    response = client.get("/books/search", params={"q": "fastapi", "limit": 5})
+
+    assert response.status_code == 200
+    assert response.json()[0]["snippet"] == "mastering <mark>FastAPI</mark>"
+    mock_book_service.search_books.assert_called_once_with("fastapi", 5)
+
+def test_export_books_ndjson(client, monkeypatch):
+    """Test GET /books/export streams one JSON document per line."""
+    mock_session = MagicMock()
+    mock_service_cls = MagicMock()
+    mock_service_cls.return_value.iter_books.return_value = [
+        BookResponse(id=1, title="Book One", author="Author One", year=2021, description="First book"),
+        BookResponse(id=2, title="Book Two", author="Author Two", year=2022, description="Second book"),
+        BookResponse(id=3, title="Book Three", author="Author Three", year=2023, description="Third book"),
+    ]
+    monkeypatch.setattr("app.routes.books.SessionLocal", lambda: mock_session)
+    monkeypatch.setattr("app.routes.books.BookService", mock_service_cls)
+
+    response = client.get("/books/export", params={"format": "ndjson", "chunk_size": 2})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = response.text.splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [1, 2, 3]
+    mock_service_cls.return_value.iter_books.assert_called_once_with(2)
+    mock_session.close.assert_called_once()
+
+def test_export_books_unknown_format(client):
+    """Test GET /books/export rejects formats other than ndjson."""
+    response = client.get("/books/export", params={"format": "xml"})
+    assert response.status_code == 422
 
 def test_get_book_found(client, mock_book_service, override_book_service):
     """Test GET /books/{book_id} when book is found."""
-    mock_book_service.get_book.return_value = BookResponse(
+    mock_book_service.get_cached_book.return_value = BookResponse(
         id=10,
         title="Some Book",
         author="Some Author",
@@ -90,18 +310,60 @@ def test_get_book_found(client, mock_book_service, override_book_service):
         "title": "Some Book",
         "author": "Some Author",
         "year": 2020,
-        "description": "A description"
+        "description": "A description",
+        "review_count": 0,
+        "last_reviewed_at": None,
+        "version": 1
     }
-    mock_book_service.get_book.assert_called_once_with(10)
+    mock_book_service.get_cached_book.assert_called_once_with(10)
+
+def test_get_book_etag_not_modified(client, mock_book_service, override_book_service):
+    """Test GET /books/{book_id} returns 304 when If-None-Match matches the ETag."""
+    mock_book_service.get_cached_book.return_value = BookResponse(
+        id=10, title="Some Book", author="Some Author", year=2020, description="A description"
+    )
+
+    first = client.get("/books/10")
+    etag = first.headers["etag"]
+    second = client.get("/books/10", headers={"If-None-Match": etag})
+
+    assert second.status_code == 304
+    assert second.headers["etag"] == etag
+    assert second.content == b""
+
+    mock_book_service.get_cached_book.return_value = BookResponse(
+        id=10, title="Changed Book", author="Some Author", year=2020, description="A description"
+    )
+    third = client.get("/books/10", headers={"If-None-Match": etag})
+    assert third.status_code == 200
+    assert third.headers["etag"] != etag
+
+def test_get_books_etag_skips_the_query(client, mock_book_service, override_book_service):
+    """Test GET /books/ answers a matching If-None-Match from the table version alone."""
+    mock_book_service.get_version.return_value = 7
+    mock_book_service.get_books_page.return_value = ([], None)
+
+    etag = client.get("/books/", params={"limit": 5}).headers["etag"]
+    mock_book_service.get_books_page.reset_mock()
+
+    response = client.get("/books/", params={"limit": 5}, headers={"If-None-Match": f'W/{etag}, "other"'})
+    assert response.status_code == 304
+    mock_book_service.get_books_page.assert_not_called()
+
+    # A write bumps the version, and a different query gets a different ETag
+    mock_book_service.get_version.return_value = 8
+    assert client.get("/books/", params={"limit": 5}, headers={"If-None-Match": etag}).status_code == 200
+    mock_book_service.get_version.return_value = 7
+    assert client.get("/books/", params={"limit": 6}, headers={"If-None-Match": etag}).status_code == 200
 
 def test_get_book_not_found(client, mock_book_service, override_book_service):
     """Test GET /books/{book_id} returns 404 when not found."""
-    mock_book_service.get_book.return_value = None  # simulate not found
+    mock_book_service.get_cached_book.return_value = None  # simulate not found
 
     response = client.get("/books/9999")
     assert response.status_code == 404
     assert response.json() == {"detail": "Book not found"}
-    mock_book_service.get_book.assert_called_once_with(9999)
+    mock_book_service.get_cached_book.assert_called_once_with(9999)
 
 def test_add_book(client, mock_book_service, override_book_service):
     """Test POST /books/ adds a new book."""
@@ -126,13 +388,55 @@ def test_add_book(client, mock_book_service, override_book_service):
         "title": "New Book",
         "author": "New Author",
         "year": 2023,
-        "description": "A new test book"
+        "description": "A new test book",
+        "review_count": 0,
+        "last_reviewed_at": None,
+        "version": 1
     }
 
     # Verify the mock was called with a BookCreate object that has the same data
     from app.models.book import BookCreate  # local import to avoid circular
     mock_book_service.add_book.assert_called_once_with(BookCreate(**payload))
 
+def test_add_books_bulk_reports_invalid_items(client, mock_book_service, override_book_service):
+    """Test POST /books/bulk inserts the valid items and reports the invalid ones."""
+    mock_book_service.add_books.return_value = [7, 8]
+
+    payload = [
+        {"title": "Bulk One", "author": "Bulk Author", "year": 2020, "description": "First bulk book"},
+        {"title": "No", "author": "Bulk Author", "year": 2020, "description": "Title too short"},
+        {"title": "Bulk Two", "author": "Bulk Author", "year": 2021, "description": "Second bulk book"},
+    ]
+    response = client.post("/books/bulk", params={"chunk_size": 100}, json=payload)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["created"] == [{"index": 0, "id": 7}, {"index": 2, "id": 8}]
+    assert [error["index"] for error in body["errors"]] == [1]
+    assert body["errors"][0]["errors"][0]["loc"] == ["title"]
+    mock_book_service.add_books.assert_called_once_with(
+        [BookCreate(**payload[0]), BookCreate(**payload[2])], 100
+    )
+
+def test_add_books_bulk_ndjson(client, mock_book_service, override_book_service):
+    """Test POST /books/bulk accepts NDJSON and reports lines that are not JSON."""
+    mock_book_service.add_books.return_value = [9]
+
+    book = {"title": "Bulk One", "author": "Bulk Author", "year": 2020, "description": "First bulk book"}
+    body = json.dumps(book) + "\n{not json\n"
+    response = client.post("/books/bulk", content=body, headers={"Content-Type": "application/x-ndjson"})
+
+    assert response.status_code == 200
+    assert response.json()["created"] == [{"index": 0, "id": 9}]
+    assert response.json()["errors"][0]["index"] == 1
+    assert response.json()["errors"][0]["errors"][0]["type"] == "json_invalid"
+
+def test_add_books_bulk_rejects_non_array(client, mock_book_service, override_book_service):
+    """Test POST /books/bulk returns 400 when the JSON body is not an array."""
+    response = client.post("/books/bulk", json={"title": "Not a list"})
+    assert response.status_code == 400
+    mock_book_service.add_books.assert_not_called()
+
 def test_update_book_found(client, mock_book_service, override_book_service):
     """Test PUT /books/{book_id} successfully updates a book."""
     mock_book_service.update_book.return_value = BookResponse(
@@ -156,11 +460,14 @@ def test_update_book_found(client, mock_book_service, override_book_service):
         "title": "Updated Book",
         "author": "Updated Author",
         "year": 2025,
-        "description": "An updated description"
+        "description": "An updated description",
+        "review_count": 0,
+        "last_reviewed_at": None,
+        "version": 1
     }
 
     from app.models.book import BookCreate
-    mock_book_service.update_book.assert_called_once_with(10, BookCreate(**payload))
+    mock_book_service.update_book.assert_called_once_with(10, BookCreate(**payload), None)
 
 def test_update_book_not_found(client, mock_book_service, override_book_service):
     """Test PUT /books/{book_id} returns 404 if the book is not found."""
@@ -176,7 +483,61 @@ def test_update_book_not_found(client, mock_book_service, override_book_service)
     assert response.status_code == 404
     assert response.json() == {"detail": "Book not found"}
     from app.models.book import BookCreate
-    mock_book_service.update_book.assert_called_once_with(9999, BookCreate(**payload))
+    mock_book_service.update_book.assert_called_once_with(9999, BookCreate(**payload), None)
+
+UPDATE_PAYLOAD = {"title": "Updated Book", "author": "Updated Author", "year": 2025, "description": "An updated description"}
+
+def test_update_book_version_conflict(client, mock_book_service, override_book_service):
+    """Test PUT /books/{book_id}?version= returns 409 when another update got there first."""
+    mock_book_service.update_book.side_effect = VersionConflict("book", 10, 4)
+
+    response = client.put("/books/10", params={"version": 3}, json=UPDATE_PAYLOAD)
+    assert response.status_code == 409
+    assert "version 4" in response.json()["detail"]
+    mock_book_service.update_book.assert_called_once_with(10, BookCreate(**UPDATE_PAYLOAD), 3)
+
+def test_update_book_if_match(client, mock_book_service, override_book_service):
+    """Test PUT /books/{book_id} with If-Match swaps on the version carried by the ETag."""
+    current = BookResponse(id=10, title="Some Book", author="Some Author", year=2020, description="A description", version=3)
+    mock_book_service.update_book.return_value = current.model_copy(update={"version": 4})
+    mock_book_service.get_cached_book.return_value = current
+    etag = client.get("/books/10").headers["etag"]
+
+    # The ETag of what the client read (possibly gzip-tagged) maps to version 3, without reading the book again
+    response = client.put("/books/10", headers={"If-Match": encoded_etag(etag, "gzip")}, json=UPDATE_PAYLOAD)
+    assert response.status_code == 200
+    mock_book_service.update_book.assert_called_once_with(10, BookCreate(**UPDATE_PAYLOAD), 3)
+    mock_book_service.get_book.assert_not_called()
+
+    # A stale, weak or other book's ETag is a conflict, and nothing is written
+    mock_book_service.update_book.reset_mock()
+    for if_match in ('"stale"', f"W/{etag}", etag.replace('"10.', '"11.')):
+        assert client.put("/books/10", headers={"If-Match": if_match}, json=UPDATE_PAYLOAD).status_code == 409
+    mock_book_service.update_book.assert_not_called()
+
+def test_update_book_if_match_survives_new_reviews(client, mock_book_service, override_book_service):
+    """Test a review posted after the GET changes the ETag's hash, but not the version it swaps on."""
+    current = BookResponse(id=10, title="Some Book", author="Some Author", year=2020, description="A description", version=3)
+    mock_book_service.get_cached_book.return_value = current
+    etag = client.get("/books/10").headers["etag"]
+
+    # The review trigger bumps review_count, so the body (and its ETag) change...
+    mock_book_service.get_cached_book.return_value = current.model_copy(update={"review_count": 1})
+    assert client.get("/books/10", headers={"If-None-Match": etag}).status_code == 200
+
+    # ...while the book row's version, and so the If-Match update, do not
+    mock_book_service.update_book.return_value = current.model_copy(update={"version": 4, "review_count": 1})
+    response = client.put("/books/10", headers={"If-Match": etag}, json=UPDATE_PAYLOAD)
+    assert response.status_code == 200
+    mock_book_service.update_book.assert_called_once_with(10, BookCreate(**UPDATE_PAYLOAD), 3)
+
+def test_update_book_if_match_stale_version(client, mock_book_service, override_book_service):
+    """Test an If-Match naming a replaced version fails the compare-and-swap with 409."""
+    mock_book_service.update_book.side_effect = VersionConflict("book", 10, 4)
+
+    response = client.put("/books/10", headers={"If-Match": '"10.3-0123abcd"'}, json=UPDATE_PAYLOAD)
+    assert response.status_code == 409
+    assert "version 4" in response.json()["detail"]
 
 def test_delete_book_found(client, mock_book_service, override_book_service):
     """Test DELETE /books/{book_id} returns success if the book was deleted."""
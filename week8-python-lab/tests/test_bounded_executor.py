@@ -0,0 +1,102 @@
+# tests/test_bounded_executor.py
+
+import asyncio
+import threading
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routes import auth
+from app.utils.bounded_executor import BoundedExecutor, ExecutorFull, percentiles
+
+def test_run_returns_the_result_off_the_event_loop():
+    executor = BoundedExecutor(max_workers=2, max_queue=2)
+
+    thread_name = asyncio.run(executor.run(lambda: threading.current_thread().name))
+
+    assert thread_name.startswith("bounded")
+    stats = executor.stats()
+    assert stats["completed"] == 1
+    assert stats["latency_ms"]["count"] == 1
+
+def test_exceptions_reach_the_caller_and_are_counted():
+    executor = BoundedExecutor(max_workers=1, max_queue=0)
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        asyncio.run(executor.run(fail))
+    assert executor.stats()["failed"] == 1
+    assert executor.stats()["running"] == 0
+
+def test_calls_beyond_the_queue_are_rejected():
+    executor = BoundedExecutor(max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.ensure_future(executor.run(release.wait))
+        queued = asyncio.ensure_future(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+        stats = executor.stats()
+        with pytest.raises(ExecutorFull):
+            await executor.run(release.wait)
+        release.set()
+        await asyncio.gather(running, queued)
+        return stats
+
+    stats = asyncio.run(scenario())
+
+    assert (stats["running"], stats["queued"]) == (1, 1)
+    assert executor.stats()["rejected"] == 1
+    assert executor.stats()["queued"] == 0
+    assert executor.stats()["completed"] == 2
+
+def test_percentiles():
+    assert percentiles([0.001 * i for i in range(1, 101)]) == {
+        "count": 100, "p50": 51.0, "p95": 96.0, "p99": 100.0, "max": 100.0,
+    }
+    assert percentiles([])["p50"] is None
+
+def test_login_sheds_load_with_503_when_the_executor_is_full(monkeypatch):
+    async def full(username, password):
+        raise ExecutorFull("full")
+
+    monkeypatch.setattr(auth.cognito_service, "authenticate_user_async", full)
+    app = FastAPI()
+    app.include_router(auth.router)
+
+    response = TestClient(app).post("/login", params={"username": "admin", "password": "goodpassword"})
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+def test_shutdown_cancels_queued_calls():
+    executor = BoundedExecutor(max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.ensure_future(executor.run(release.wait))
+        queued = asyncio.ensure_future(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+        executor.shutdown()
+        release.set()
+        return await asyncio.gather(running, queued, return_exceptions=True)
+
+    running, queued = asyncio.run(scenario())
+
+    assert running is True
+    assert isinstance(queued, asyncio.CancelledError)
+    assert executor.stats()["queued"] == 0
+
+def test_run_after_shutdown_is_rejected():
+    executor = BoundedExecutor(max_workers=1, max_queue=1)
+    executor.shutdown()
+
+    for _ in range(3):
+        with pytest.raises(ExecutorFull):
+            asyncio.run(executor.run(lambda: None))
+
+    stats = executor.stats()
+    assert (stats["running"], stats["queued"], stats["rejected"]) == (0, 0, 3)
@@ -0,0 +1,83 @@
+# tests/test_change_feed.py
+#
+# The changes feed, appended by triggers on a real, migrated SQLite database.
+
+import pytest
+from unittest.mock import MagicMock
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models.book import BookCreate
+from app.models.review import ReviewCreate
+from app.routes.changes import get_change_service
+from app.services.book_service import BookService
+from app.services.change_service import ChangeService, AsyncChangeService
+from app.services.review_service import ReviewService
+
+def book(title: str) -> BookCreate:
+    return BookCreate(title=title, author="Some Author", year=2020, description="A book for the change feed tests.")
+
+def entries(changes):
+    return [(change.entity, change.entity_id, change.book_id, change.op) for change in changes]
+
+def test_every_write_is_logged_with_tombstones_for_deletes(migrated_db):
+    books, reviews, feed = BookService(migrated_db), ReviewService(migrated_db), ChangeService(migrated_db)
+
+    first, second = books.add_books([book("First"), book("Second")])
+    review_id = reviews.add_review(first, ReviewCreate(review="Nice")).id
+    reviews.update_review(first, review_id, ReviewCreate(review="Very nice"))
+    books.update_book(second, book("Second, revised"))
+    # Deleting a book also logs the reviews its foreign key cascades to
+    books.delete_book(first)
+
+    changes, cursor, has_more = feed.get_changes()
+    assert entries(changes) == [
+        ("book", first, first, "create"),
+        ("book", second, second, "create"),
+        ("review", review_id, first, "create"),
+        ("review", review_id, first, "update"),
+        ("book", second, second, "update"),
+        ("review", review_id, first, "delete"),
+        ("book", first, first, "delete"),
+    ]
+    assert [change.seq for change in changes] == sorted(change.seq for change in changes)
+    assert has_more is False
+
+    # Nothing new: the same cursor comes back, ready for the next poll
+    assert feed.get_changes(cursor) == ([], cursor, False)
+    books.add_book(book("Third"))
+    assert entries(feed.get_changes(cursor)[0])[0][3] == "create"
+
+def test_review_count_updates_are_not_book_changes(migrated_db):
+    books, reviews, feed = BookService(migrated_db), ReviewService(migrated_db), ChangeService(migrated_db)
+    (book_id,) = books.add_books([book("Reviewed")])
+    cursor = feed.get_changes()[1]
+
+    reviews.add_review(book_id, ReviewCreate(review="Counted"))
+
+    assert [change.entity for change in feed.get_changes(cursor)[0]] == ["review"]
+
+def test_changes_come_in_batches(migrated_db):
+    BookService(migrated_db).add_books([book(f"Book {i}") for i in range(5)])
+    feed = ChangeService(migrated_db)
+
+    seen, cursor, has_more = [], None, True
+    while has_more:
+        changes, cursor, has_more = feed.get_changes(cursor, 2)
+        seen.extend(change.entity_id for change in changes)
+    assert seen == [1, 2, 3, 4, 5]
+
+    with pytest.raises(ValueError):
+        feed.get_changes("not-a-cursor")
+
+def test_get_changes_route():
+    service = MagicMock(spec=AsyncChangeService)
+    service.get_changes.side_effect = ValueError("Invalid cursor")
+    app.dependency_overrides[get_change_service] = lambda: service
+    try:
+        response = TestClient(app).get("/changes/", params={"since": "bad", "limit": 10})
+    finally:
+        app.dependency_overrides = {}
+
+    assert response.status_code == 400
+    service.get_changes.assert_called_once_with("bad", 10)
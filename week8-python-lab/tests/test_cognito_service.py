@@ -0,0 +1,260 @@
+# tests/test_cognito_service.py
+
+import asyncio
+import threading
+import time
+
+import pytest
+import requests
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import HTTPException
+from jose import jwk, jwt
+
+from app.services import cognito_service
+from app.services.cognito_service import CognitoService
+from app.services.local_cognito import get_local_cognito, parse_users
+from app.utils.ttl_cache import TTLCache
+
+def rsa_pem():
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+
+SIGNING_KEY = rsa_pem()
+OTHER_KEY = rsa_pem()
+
+class FakeClock:
+    """A clock the tests can move forward by hand."""
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cognito_service, "claims_cache", TTLCache(maxsize=10, ttl=300, clock=clock))
+    return clock
+
+def public_jwk(pem, kid):
+    return {**jwk.construct(pem, "RS256").public_key().to_dict(), "kid": kid}
+
+@pytest.fixture
+def jwks(monkeypatch):
+    """The key set the fake Cognito publishes, and a log of its fetches."""
+    published = {"keys": [public_jwk(SIGNING_KEY, "test-kid")], "fetches": 0, "delay": 0.0}
+
+    def fetch(self):
+        published["fetches"] += 1
+        time.sleep(published["delay"])
+        return list(published["keys"])
+
+    monkeypatch.setattr(CognitoService, "_get_cognito_jwks", fetch)
+    return published
+
+@pytest.fixture
+def service(jwks, clock):
+    return CognitoService()
+
+@pytest.fixture
+def decode_calls(monkeypatch):
+    calls = []
+    decode = jwt.decode
+
+    def spy(*args, **kwargs):
+        calls.append(args[0])
+        return decode(*args, **kwargs)
+
+    monkeypatch.setattr(cognito_service.jwt, "decode", spy)
+    return calls
+
+def make_token(service, expires_in=3600, key=SIGNING_KEY, kid="test-kid", **claims):
+    claims = {
+        "sub": "user-1",
+        "cognito:groups": ["Users"],
+        "iss": f"https://cognito-idp.{service.region}.amazonaws.com/{service.user_pool_id}",
+        "exp": int(time.time()) + expires_in,
+        **claims,
+    }
+    return jwt.encode(claims, key, algorithm="RS256", headers={"kid": kid})
+
+def test_repeated_token_is_verified_once(service, decode_calls):
+    token = make_token(service)
+
+    first = service.verify_token(token)
+    second = service.verify_token(token)
+
+    assert first == second
+    assert first["cognito:groups"] == ["Users"]
+    assert len(decode_calls) == 1
+    assert cognito_service.claims_cache.stats()["hits"] == 1
+
+def test_cached_claims_expire_with_the_token(service, clock, decode_calls):
+    token = make_token(service, expires_in=60)
+    service.verify_token(token)
+
+    # The cache's TTL is 300 seconds, but the entry expires with the token
+    clock.now = 61
+    service.verify_token(token)
+    assert len(decode_calls) == 2
+
+def test_callers_cannot_change_the_cached_claims(service):
+    token = make_token(service)
+    service.verify_token(token)["sub"] = "someone-else"
+
+    assert service.verify_token(token)["sub"] == "user-1"
+
+def test_invalid_signature_is_rejected_and_not_cached(service, decode_calls):
+    token = make_token(service, key=OTHER_KEY)
+
+    for _ in range(2):
+        with pytest.raises(HTTPException) as error:
+            service.verify_token(token)
+        assert error.value.status_code == 401
+    assert len(decode_calls) == 2
+    assert cognito_service.claims_cache.stats()["size"] == 0
+
+def test_expired_token_is_rejected(service):
+    with pytest.raises(HTTPException) as error:
+        service.verify_token(make_token(service, expires_in=-10))
+
+    assert error.value.status_code == 401
+    assert error.value.detail == "Token has expired."
+
+def test_jwks_is_fetched_on_first_use(service, jwks):
+    assert jwks["fetches"] == 0
+
+    service.verify_token(make_token(service))
+    service.verify_token(make_token(service, sub="user-2"))
+    assert jwks["fetches"] == 1
+
+def age_jwks(service, seconds):
+    """Pretend the JWKS was fetched `seconds` earlier."""
+    service._jwks_attempted_at -= seconds
+    service._jwks_fetched_at -= seconds
+
+def test_rotated_key_is_fetched_once_for_concurrent_requests(service, jwks):
+    service.verify_token(make_token(service))
+    age_jwks(service, 60)
+    jwks["keys"].append(public_jwk(OTHER_KEY, "new-kid"))
+    jwks["delay"] = 0.1
+    tokens = [make_token(service, key=OTHER_KEY, kid="new-kid", sub=f"user-{i}") for i in range(8)]
+
+    threads = [threading.Thread(target=service.verify_token, args=(token,)) for token in tokens]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert jwks["fetches"] == 2
+    assert service.verify_token(tokens[0])["sub"] == "user-0"
+
+def test_unknown_kid_refetches_at_most_once_per_interval(service, jwks):
+    service.verify_token(make_token(service))
+    age_jwks(service, 60)
+    token = make_token(service, kid="unknown-kid")
+
+    for _ in range(3):
+        with pytest.raises(HTTPException) as error:
+            service.verify_token(token)
+        assert error.value.status_code == 401
+    assert jwks["fetches"] == 2
+
+def test_stale_keys_are_used_while_refreshed_in_the_background(service, jwks):
+    service.verify_token(make_token(service))
+    age_jwks(service, service.jwks_ttl + 60)
+
+    assert service.verify_token(make_token(service, sub="user-2"))["sub"] == "user-2"
+    service._refresh_thread.join()
+    assert jwks["fetches"] == 2
+
+def test_failed_first_fetch_is_503_and_retried_on_the_next_request(clock, monkeypatch):
+    service = CognitoService()
+    token = make_token(service)
+    responses = []
+
+    def get(url, timeout):
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    class JWKSResponse:
+        status_code = 200
+
+        def json(self):
+            return {"keys": [public_jwk(SIGNING_KEY, "test-kid")]}
+
+    monkeypatch.setattr(requests, "get", get)
+    responses.extend([requests.ConnectionError("Cognito is down"), JWKSResponse()])
+
+    with pytest.raises(HTTPException) as error:
+        service.verify_token(token)
+    assert error.value.status_code == 503
+
+    # No keys yet, so the next request fetches again rather than waiting out COGNITO_JWKS_MIN_REFRESH
+    assert service.verify_token(token)["sub"] == "user-1"
+    assert responses == []
+
+async def longest_stall(coroutine, tick=0.02):
+    """Await `coroutine` while a ticker runs on the same loop; return the longest gap between ticks."""
+    ticks = [time.perf_counter()]
+
+    async def ticker():
+        while True:
+            await asyncio.sleep(tick)
+            ticks.append(time.perf_counter())
+
+    task = asyncio.ensure_future(ticker())
+    try:
+        result = await coroutine
+        await asyncio.sleep(tick * 2)
+    finally:
+        task.cancel()
+    return result, max(b - a for a, b in zip(ticks, ticks[1:]))
+
+def test_async_cache_miss_does_not_block_the_event_loop(service, jwks):
+    # The first token also pays for the JWKS fetch, slowed down here
+    jwks["delay"] = 0.5
+    token = make_token(service)
+
+    claims, stall = asyncio.run(longest_stall(service.verify_token_async(token)))
+
+    assert claims["sub"] == "user-1"
+    assert stall < 0.25
+    assert asyncio.run(service.verify_token_async(token)) == claims
+    assert cognito_service.claims_cache.stats()["hits"] == 1
+
+@pytest.fixture
+def local_service(monkeypatch, clock):
+    monkeypatch.setenv("COGNITO_MODE", "local")
+    monkeypatch.setenv("COGNITO_LOCAL_USERS", "admin:goodpassword:Admins|Users,reader:password:Users")
+    get_local_cognito.cache_clear()
+    yield CognitoService()
+    get_local_cognito.cache_clear()
+
+def test_local_pool_logs_in_and_verifies_its_tokens(local_service):
+    tokens = local_service.authenticate_user("admin", "goodpassword")
+
+    access = local_service.verify_token(tokens["access_token"])
+    assert access["username"] == "admin"
+    assert access["cognito:groups"] == ["Admins", "Users"]
+    # The ID token carries the client id as its audience, which verify_token checks
+    assert local_service.verify_token(tokens["id_token"])["cognito:username"] == "admin"
+
+def test_local_pool_rejects_a_wrong_password(local_service):
+    with pytest.raises(HTTPException) as error:
+        local_service.authenticate_user("reader", "wrong")
+
+    assert error.value.status_code == 401
+
+def test_local_pools_share_keys_across_services(local_service):
+    token = local_service.authenticate_user("reader", "password")["access_token"]
+
+    assert CognitoService().verify_token(token)["cognito:groups"] == ["Users"]
+
+def test_parse_users():
+    assert parse_users("a:pw:G1|G2, b:secret") == {"a": ("pw", ["G1", "G2"]), "b": ("secret", [])}
@@ -0,0 +1,163 @@
+# tests/test_compression.py
+
+import gzip
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.utils import compression
+from app.utils.compression import CompressionMiddleware
+from app.utils.etag import encoded_etag, etag_matches
+
+BIG = b'{"items":[' + b",".join(b'{"id":%d,"title":"Book"}' % i for i in range(500)) + b"]}"
+
+def make_app():
+    app = FastAPI()
+
+    # Async handlers, so the only worker-thread calls are the middleware's own
+    @app.get("/big")
+    async def big():
+        return Response(BIG, media_type="application/json", headers={"ETag": '"abc"'})
+
+    @app.get("/cached")
+    async def cached():
+        return Response(status_code=304, headers={"ETag": '"abc"'})
+
+    @app.get("/small")
+    async def small():
+        return Response(b'{"id":1}', media_type="application/json")
+
+    @app.get("/image")
+    async def image():
+        return Response(BIG, media_type="image/png")
+
+    @app.get("/stream")
+    async def stream():
+        async def lines():
+            for i in range(100):
+                yield b'{"id":%d}\n' % i
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    return app
+
+@pytest.fixture
+def client():
+    """A small app behind the middleware with gzip as its only coding."""
+    middleware = CompressionMiddleware(make_app(), minimum_size=1024, offload_size=1024)
+    middleware.compressors = {"gzip": middleware.compressors["gzip"]}
+    return TestClient(middleware)
+
+def test_large_json_is_gzipped(client):
+    response = client.get("/big", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(BIG)
+    assert response.content == BIG
+    # The compressed representation has its own ETag, which still matches the identity one
+    assert response.headers["etag"] == '"abc-gzip"'
+    assert etag_matches(response.headers["etag"], '"abc"')
+
+def test_not_modified_repeats_the_compressed_etag(client):
+    response = client.get("/cached", headers={"Accept-Encoding": "gzip", "If-None-Match": '"abc-gzip"'})
+    assert response.status_code == 304
+    assert response.headers["etag"] == '"abc-gzip"'
+
+    response = client.get("/cached", headers={"Accept-Encoding": "gzip", "If-None-Match": '"abc"'})
+    assert response.headers["etag"] == '"abc"'
+
+def test_small_or_incompressible_bodies_are_sent_as_they_are(client):
+    for path in ("/small", "/image"):
+        response = client.get(path, headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+
+def test_no_compression_without_accept_encoding(client):
+    response = client.get("/big", headers={"Accept-Encoding": "identity"})
+
+    assert "content-encoding" not in response.headers
+    assert response.headers["etag"] == '"abc"'
+    assert response.content == BIG
+
+def test_streamed_body_is_compressed_chunk_by_chunk(client):
+    with client.stream("GET", "/stream", headers={"Accept-Encoding": "gzip"}) as response:
+        raw = b"".join(response.iter_raw())
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert gzip.decompress(raw) == b"".join(b'{"id":%d}\n' % i for i in range(100))
+
+def test_large_bodies_are_compressed_off_the_event_loop(client, monkeypatch):
+    offloaded = []
+    run_sync = compression.anyio.to_thread.run_sync
+
+    async def spy(function, *args):
+        offloaded.append(len(args[0]))
+        return await run_sync(function, *args)
+
+    monkeypatch.setattr(compression.anyio.to_thread, "run_sync", spy)
+    client.get("/big", headers={"Accept-Encoding": "gzip"})
+    client.get("/stream", headers={"Accept-Encoding": "gzip"})
+
+    # Only the body above offload_size went to a worker thread; the small chunks did not
+    assert offloaded == [len(BIG)]
+
+STREAMED = b"".join(b'{"id":%d}\n' % i for i in range(100))
+
+def brotli_decompress(data: bytes) -> bytes:
+    return pytest.importorskip("brotli").decompress(data)
+
+def zstd_decompress(data: bytes) -> bytes:
+    # Streamed frames carry no content size, so read them through a stream reader
+    zstandard = pytest.importorskip("zstandard")
+    with zstandard.ZstdDecompressor().stream_reader(data) as reader:
+        return reader.read()
+
+@pytest.mark.parametrize("encoding, module, decompress", [
+    ("br", "brotli", brotli_decompress),
+    ("zstd", "zstandard", zstd_decompress),
+])
+def test_brotli_and_zstd_bodies_round_trip(encoding, module, decompress):
+    pytest.importorskip(module)
+    client = TestClient(CompressionMiddleware(make_app(), minimum_size=1024))
+
+    with client.stream("GET", "/big", headers={"Accept-Encoding": encoding}) as response:
+        raw = b"".join(response.iter_raw())
+    assert response.headers["content-encoding"] == encoding
+    assert response.headers["etag"] == f'"abc-{encoding}"'
+    assert len(raw) < len(BIG)
+    assert decompress(raw) == BIG
+
+    with client.stream("GET", "/stream", headers={"Accept-Encoding": encoding}) as response:
+        raw = b"".join(response.iter_raw())
+    assert response.headers["content-encoding"] == encoding
+    assert decompress(raw) == STREAMED
+
+def test_available_codings_are_preferred_zstd_then_brotli_then_gzip():
+    pytest.importorskip("brotli")
+    pytest.importorskip("zstandard")
+    client = TestClient(CompressionMiddleware(make_app(), minimum_size=1024))
+
+    for accept_encoding, expected in [("gzip, br, zstd", "zstd"), ("gzip, br", "br"), ("br;q=0.5, gzip", "gzip")]:
+        response = client.get("/big", headers={"Accept-Encoding": accept_encoding})
+        assert response.headers["content-encoding"] == expected
+        assert response.content == BIG
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    ("gzip, br, zstd", "zstd"),
+    ("gzip;q=1.0, br;q=0.5", "gzip"),
+    ("br;q=0.8, zstd;q=0", "br"),
+    ("*", "zstd"),
+    ("identity, gzip;q=0", None),
+    ("", None),
+])
+def test_choose_encoding(accept_encoding, expected):
+    middleware = CompressionMiddleware(None)
+    middleware.compressors = dict.fromkeys(["zstd", "br", "gzip"])
+
+    assert middleware.choose_encoding(accept_encoding) == expected
+
+def test_encoded_etag():
+    assert encoded_etag('"abc"', "br") == '"abc-br"'
+    assert etag_matches('W/"abc-zstd", "other"', '"abc"')
+    assert not etag_matches('"abc-deflate"', '"abc"')
@@ -0,0 +1,103 @@
+# tests/test_db.py
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app import main
+from app.db.db import apply_sqlite_pragmas, optimize_on_close, sqlite_pragmas, SQLITE_PRAGMAS
+from app.models.book import BookCreate
+from app.routes import books
+from app.services.book_service import BookService
+from app.utils.bounded_executor import BoundedExecutor
+
+@pytest.fixture
+def sqlite_file_url(tmp_path):
+    """A throwaway SQLite file (WAL needs a real file, not :memory:)."""
+    return f"sqlite:///{tmp_path / 'test.db'}"
+
+def test_performance_profile_is_applied_to_every_connection(sqlite_file_url, monkeypatch):
+    # 1) Arrange
+    monkeypatch.delenv("SQLITE_CACHE_SIZE", raising=False)
+    engine = create_engine(sqlite_file_url)
+    apply_sqlite_pragmas(engine, sqlite_pragmas("performance"))
+
+    # 2) Act
+    with engine.connect() as connection:
+        settings = {
+            name: connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+            for name in ["journal_mode", "synchronous", "cache_size", "temp_store", "busy_timeout"]
+        }
+
+    # 3) Assert
+    assert settings == {
+        "journal_mode": "wal",
+        "synchronous": 1,  # NORMAL
+        "cache_size": -65536,
+        "temp_store": 2,  # MEMORY
+        "busy_timeout": 5000,
+    }
+
+def test_default_profile_keeps_sqlite_defaults(sqlite_file_url):
+    engine = create_engine(sqlite_file_url)
+    apply_sqlite_pragmas(engine, sqlite_pragmas("default"))
+
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA journal_mode").scalar() == "delete"
+        assert connection.exec_driver_sql("PRAGMA synchronous").scalar() == 2  # FULL
+
+def test_pragmas_can_be_overridden_from_the_environment(monkeypatch):
+    monkeypatch.setenv("SQLITE_CACHE_SIZE", "-131072")
+
+    assert sqlite_pragmas("performance")["cache_size"] == "-131072"
+
+def test_invalid_profile_and_values_are_rejected(monkeypatch):
+    with pytest.raises(ValueError):
+        sqlite_pragmas("turbo")
+
+    monkeypatch.setenv("SQLITE_JOURNAL_MODE", "WAL; DROP TABLE books")
+    with pytest.raises(ValueError):
+        sqlite_pragmas("performance")
+
+def has_planner_statistics(engine) -> bool:
+    with engine.connect() as connection:
+        return connection.exec_driver_sql("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").first() is not None
+
+def test_lifespan_shutdown_refreshes_planner_statistics(migrated_db, monkeypatch):
+    # 1) Arrange: the application's engines, pointed at a migrated throwaway database
+    BookService(migrated_db).add_books([
+        BookCreate(title=f"Book {i}", author=f"Author {i % 50}", year=1900 + i % 100, description="A seeded book.")
+        for i in range(2000)
+    ])
+    path = migrated_db.get_bind().url.database
+    sync_engine = create_engine(f"sqlite:///{path}")
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=AsyncAdaptedQueuePool)
+    for engine in (sync_engine, async_engine.sync_engine):
+        apply_sqlite_pragmas(engine, SQLITE_PRAGMAS)
+        optimize_on_close(engine)
+    sessions = async_sessionmaker(autoflush=False, expire_on_commit=False, bind=async_engine)
+
+    async def get_db():
+        async with sessions() as db:
+            yield db
+
+    monkeypatch.setattr(main, "engine", sync_engine)
+    monkeypatch.setattr(main, "async_engine", async_engine)
+    monkeypatch.setattr(main, "cognito_executor", BoundedExecutor(max_workers=1, max_queue=0))
+    main.app.dependency_overrides[books.get_db] = get_db
+    assert not has_planner_statistics(sync_engine)
+
+    # 2) Act: serve filtered queries, then run the lifespan's shutdown
+    try:
+        with TestClient(main.app) as client:
+            for author in range(10):
+                assert client.get("/books/", params={"author": f"Author {author}", "sort": "year"}).status_code == 200
+    finally:
+        main.app.dependency_overrides = {}
+
+    # 3) Assert
+    assert has_planner_statistics(sync_engine)
+    sync_engine.dispose()
+
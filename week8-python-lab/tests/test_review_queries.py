@@ -0,0 +1,114 @@
+# tests/test_review_queries.py
+#
+# ReviewService queries run against a real, migrated SQLite database.
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.dialects import sqlite
+
+from app.models.book import Book
+from app.models.review import Review, ReviewCreate
+from app.services.book_service import BookService, VersionConflict, book_cache
+from app.services.review_service import ReviewService
+
+@pytest.fixture
+def reviews(migrated_db):
+    migrated_db.add_all([
+        Book(id=1, title="Popular", author="Someone", year=2020, description="Reviewed a lot."),
+        Book(id=2, title="Quiet", author="Someone", year=2021, description="Reviewed a little."),
+    ])
+    # Interleave the two books' reviews so a page has to skip the other book's rows
+    migrated_db.add_all([Review(book_id=1 + i % 3 // 2, review=f"Review {i}") for i in range(30)])
+    migrated_db.commit()
+    return ReviewService(migrated_db)
+
+def test_review_pages_cover_every_review_once_in_order(reviews):
+    expected = [review.id for review in reviews.get_reviews_by_book_id(1)]
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = reviews.get_reviews_page(1, 4, cursor)
+        seen.extend(review.id for review in page)
+        if cursor is None:
+            break
+    assert seen == expected == sorted(expected)
+    assert {review.book_id for review in reviews.get_reviews_by_book_id(1)} == {1}
+
+def test_review_page_rejects_foreign_cursors(reviews):
+    with pytest.raises(ValueError):
+        reviews.get_reviews_page(1, 4, "not-a-cursor")
+
+def test_review_page_reads_the_book_id_index(reviews, migrated_db):
+    cursor = reviews.get_reviews_page(1, 4)[1]
+
+    query = reviews._page_query(1, 4, cursor)
+    sql = query.statement.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True})
+    plan = "\n".join(row[-1] for row in migrated_db.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+    assert "USING INDEX ix_reviews_book_id_id (book_id=? AND id>?)" in plan
+    assert "TEMP B-TREE" not in plan
+
+@pytest.fixture
+def statements(migrated_db):
+    """The SQL statements run on the test database while the test runs."""
+    statements = []
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+    event.listen(migrated_db.bind, "before_cursor_execute", record)
+    yield statements
+    event.remove(migrated_db.bind, "before_cursor_execute", record)
+
+def test_review_writes_are_one_statement_each(reviews, statements, migrated_db):
+    # Like the application's AsyncSessionLocal, so returned rows are not reloaded after commit
+    migrated_db.expire_on_commit = False
+    added = reviews.add_review(2, ReviewCreate(review="Fresh"))
+    updated = reviews.update_review(2, added.id, ReviewCreate(review="Edited"))
+    deleted = reviews.delete_review(2, added.id)
+
+    assert (added.book_id, updated.id, updated.review, deleted) == (2, added.id, "Edited", True)
+    assert [statement.split()[0] for statement in statements] == ["INSERT", "UPDATE", "DELETE"]
+
+def test_review_writes_report_missing_books_and_reviews(reviews):
+    # The foreign key rejects the insert, and the session stays usable afterwards
+    assert reviews.add_review(999, ReviewCreate(review="Orphan")) is None
+    first = reviews.get_reviews_page(1, 1)[0][0]
+    # A review id only matches together with its own book
+    assert reviews.update_review(2, first.id, ReviewCreate(review="Wrong book")) is None
+    assert reviews.delete_review(2, first.id) is None
+    assert reviews.update_review(1, first.id, ReviewCreate(review="Right book")).review == "Right book"
+
+def test_review_update_refreshes_an_already_loaded_review(reviews, migrated_db):
+    migrated_db.expire_on_commit = False
+    loaded = reviews.get_reviews_page(1, 1)[0][0]
+
+    updated = reviews.update_review(1, loaded.id, ReviewCreate(review="Edited"))
+    assert updated is loaded and loaded.review == "Edited"
+
+def test_review_triggers_keep_the_book_counters(reviews, migrated_db):
+    books = BookService(migrated_db)
+    assert books.get_book(1).review_count == 20
+    cached = books.get_cached_book(2)
+    assert cached.review_count == 10
+
+    added = reviews.add_review(2, ReviewCreate(review="One more"))
+    # The review write drops the cached copy, which still had the old count
+    assert book_cache.get(2) is None
+    book = books.get_cached_book(2)
+    assert book.review_count == 11 and book.last_reviewed_at is not None
+
+    reviews.delete_review(2, added.id)
+    assert books.get_cached_book(2).review_count == 10
+
+    # Deleting every review resets the book to never reviewed
+    for review in reviews.get_reviews_by_book_id(2):
+        reviews.delete_review(2, review.id)
+    book = books.get_cached_book(2)
+    assert (book.review_count, book.last_reviewed_at) == (0, None)
+
+def test_review_update_with_version_is_a_compare_and_swap(reviews):
+    review = reviews.get_reviews_page(1, 1)[0][0]
+    review_id = review.id
+
+    assert reviews.update_review(1, review_id, ReviewCreate(review="First"), version=1).version == 2
+    with pytest.raises(VersionConflict):
+        reviews.update_review(1, review_id, ReviewCreate(review="Second"), version=1)
+    assert reviews.update_review(2, review_id, ReviewCreate(review="Wrong book"), version=2) is None
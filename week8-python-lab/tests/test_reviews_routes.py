@@ -0,0 +1,119 @@
+import pytest
+from unittest.mock import MagicMock
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models.review import Review
+from app.services.book_service import VersionConflict
+from app.services.cognito_service import get_claims
+from app.services.review_service import AsyncReviewService
+from app.routes.reviews import get_review_service
+
+@pytest.fixture
+def client():
+    """Fixture to create a new TestClient for each test."""
+    return TestClient(app)
+
+@pytest.fixture
+def mock_review_service():
+    """A mock AsyncReviewService whose async methods the routes can await."""
+    return MagicMock(spec=AsyncReviewService)
+
+@pytest.fixture
+def override_review_service(mock_review_service):
+    """
+    Override the get_review_service dependency with our mock_review_service, and
+    authorize writes as a user. After the test ends, clear overrides.
+    """
+    app.dependency_overrides[get_review_service] = lambda: mock_review_service
+    app.dependency_overrides[get_claims] = lambda: {"cognito:groups": ["Users"]}
+    yield
+    app.dependency_overrides = {}
+
+def review(id, book_id=1, text="Great read", version=1):
+    return Review(id=id, book_id=book_id, review=text, version=version)
+
+def test_get_reviews_page(client, mock_review_service, override_review_service):
+    """Test GET /books/{book_id}/reviews returns one page and the cursor for the next."""
+    mock_review_service.get_version.return_value = 3
+    mock_review_service.get_reviews_page.return_value = ([review(1), review(2)], "next-page")
+
+    response = client.get("/books/1/reviews", params={"limit": 2})
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "items": [
+            {"review": "Great read", "id": 1, "book_id": 1, "version": 1},
+            {"review": "Great read", "id": 2, "book_id": 1, "version": 1},
+        ],
+        "next_cursor": "next-page",
+    }
+    mock_review_service.get_reviews_page.assert_called_once_with(1, 2, None)
+
+    client.get("/books/1/reviews", params={"limit": 2, "after": "next-page"})
+    mock_review_service.get_reviews_page.assert_called_with(1, 2, "next-page")
+
+def test_get_reviews_invalid_cursor(client, mock_review_service, override_review_service):
+    """Test GET /books/{book_id}/reviews returns 400 for a malformed cursor."""
+    mock_review_service.get_version.return_value = 3
+    mock_review_service.get_reviews_page.side_effect = ValueError("Invalid cursor")
+
+    response = client.get("/books/1/reviews", params={"after": "not-a-cursor"})
+
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid cursor"}
+
+def test_get_reviews_all_returns_a_plain_list(client, mock_review_service, override_review_service):
+    """Test GET /books/{book_id}/reviews?all=true opts out of pagination."""
+    mock_review_service.get_version.return_value = 3
+    mock_review_service.get_reviews_by_book_id.return_value = [review(1), review(2)]
+
+    response = client.get("/books/1/reviews", params={"all": "true"})
+
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()] == [1, 2]
+    mock_review_service.get_reviews_page.assert_not_called()
+
+def test_get_reviews_not_found(client, mock_review_service, override_review_service):
+    """Test GET /books/{book_id}/reviews returns 404 when the book has no reviews."""
+    mock_review_service.get_version.return_value = 3
+    mock_review_service.get_reviews_page.return_value = ([], None)
+
+    assert client.get("/books/1/reviews").status_code == 404
+
+def test_get_reviews_etag_not_modified(client, mock_review_service, override_review_service):
+    """Test GET /books/{book_id}/reviews answers a matching If-None-Match with 304 before reading reviews."""
+    mock_review_service.get_version.return_value = 3
+    mock_review_service.get_reviews_page.return_value = ([review(1)], None)
+
+    etag = client.get("/books/1/reviews").headers["etag"]
+    mock_review_service.get_reviews_page.reset_mock()
+
+    response = client.get("/books/1/reviews", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    mock_review_service.get_reviews_page.assert_not_called()
+
+    # Any review write bumps the table version, and with it the ETag
+    mock_review_service.get_version.return_value = 4
+    assert client.get("/books/1/reviews", headers={"If-None-Match": etag}).status_code == 200
+
+def test_update_review_with_stale_version_conflicts(client, mock_review_service, override_review_service):
+    """Test PUT /books/{book_id}/reviews/{review_id} returns 409 when ?version is stale."""
+    mock_review_service.update_review.side_effect = VersionConflict("review", 5, current_version=3)
+
+    response = client.put("/books/1/reviews/5", params={"version": 2}, json={"review": "Changed my mind"})
+
+    assert response.status_code == 409
+    assert response.json() == {"detail": "Review was modified since it was read: it is now at version 3"}
+    args = mock_review_service.update_review.call_args.args
+    assert (args[0], args[1], args[3]) == (1, 5, 2)
+
+def test_update_review_with_current_version(client, mock_review_service, override_review_service):
+    """Test PUT /books/{book_id}/reviews/{review_id} returns the review at its new version."""
+    mock_review_service.update_review.return_value = review(5, text="Changed my mind", version=3)
+
+    response = client.put("/books/1/reviews/5", params={"version": 2}, json={"review": "Changed my mind"})
+
+    assert response.status_code == 200
+    assert response.json() == {"review": "Changed my mind", "id": 5, "book_id": 1, "version": 3}
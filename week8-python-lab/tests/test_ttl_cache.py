@@ -0,0 +1,60 @@
+# tests/test_ttl_cache.py
+
+from app.utils.ttl_cache import TTLCache
+
+class FakeClock:
+    """A clock the tests can move forward by hand."""
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_get_returns_cached_value_and_counts_hits_and_misses():
+    cache = TTLCache(maxsize=10, ttl=60)
+
+    assert cache.get(1) is None
+    cache.set(1, "one")
+    assert cache.get(1) == "one"
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["size"] == 1
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl=60, clock=clock)
+    cache.set(1, "one")
+    cache.set(2, "two", ttl=5)
+
+    clock.now = 10
+    assert cache.get(2) is None  # per-entry TTL
+    assert cache.get(1) == "one"
+
+    clock.now = 61
+    assert cache.get(1) is None
+    assert cache.stats()["expirations"] == 2
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set(1, "one")
+    cache.set(2, "two")
+    cache.get(1)  # 2 is now the least recently used entry
+
+    cache.set(3, "three")
+
+    assert cache.get(2) is None
+    assert cache.get(1) == "one"
+    assert cache.get(3) == "three"
+    assert cache.stats()["evictions"] == 1
+
+def test_invalidate_and_disabled_cache():
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set(1, "one")
+    cache.invalidate(1)
+    assert cache.get(1) is None
+
+    disabled = TTLCache(maxsize=0, ttl=60)
+    disabled.set(1, "one")
+    assert disabled.get(1) is None